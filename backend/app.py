@@ -1,28 +1,59 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import os
+import json
+import multiprocessing
 
-from models.text_extraction import extract_text_from_pdf, extract_text_from_image
+from models.text_extraction import extract_text_from_pdf, extract_text_from_image, iter_pdf_pages
 from models.simplification import simplify_text
 from models.translation import translate_text
 from models.similarity import compute_similarity
-from models.bias_detection import detect_bias
+from models.bias_detection import detect_bias, BIAS_MODES
 from models.wcag_checker import check_wcag_compliance
 from models.sign_language import generate_gloss
-from models.image_captioning import generate_alt_text
+from models.image_captioning import generate_alt_text, generate_alt_text_batch, FLORENCE_PROFILES
 from models.speech_to_text import transcribe_audio
 from models.video_processing import process_video_for_accessibility, transcribe_video
+from models.pipeline import run_process_pipeline, build_process_stages, iter_stages
+from models.jobs import submit_job, get_job, resume_pending_jobs, purge_finished_jobs
+from models.cache import get_cache_stats
+from models.image_hash import get_perceptual_index_stats
+from models.registry import registry, warmup_models
+from models.uploads import Upload, as_upload, uploads_from_zip
+from models.batching import get_batching_stats
 
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:3000", "http://127.0.0.1:3000"])
 
 
+ALT_TEXT_BATCH_MAX_IMAGES = int(os.getenv("ALT_TEXT_BATCH_MAX_IMAGES", "300"))
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".tif", ".tiff"}
+
 UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 app.config["MAX_CONTENT_LENGTH"] = 500 * 1024 * 1024  # 500MB max for video uploads
 
 
+def start_background_services():
+    """
+    Warm up models, resume queued jobs and purge expired ones.
+
+    Call this once in the process that serves requests, never at import:
+    the debug reloader's watcher process imports this module too, and it
+    would claim jobs it never gets reloaded to run. WSGI servers should
+    call it from their worker start-up hook.
+    """
+    if multiprocessing.parent_process() is not None:
+        # PDF pool workers (forkserver/spawn) import this module as __mp_main__
+        return
+    if os.getenv("WARMUP_MODELS"):
+        warmup_models()
+    if os.getenv("JOBS_RESUME_ON_START", "1") == "1":
+        resume_pending_jobs()
+    purge_finished_jobs()
+
+
 @app.route("/health", methods=["GET"])
 def health_check():
     return jsonify({
@@ -43,74 +74,146 @@ def health_check():
     })
 
 
+def _get_process_inputs():
+    """Read the text and optional image/audio/pdf uploads of a /process style request"""
+    if request.is_json:
+        data = request.get_json() or {}
+        return data.get("text", ""), {}
+
+    # read each upload once; every stage shares the captured bytes
+    text_content = request.form.get("text", "")
+    files = {
+        field: Upload(request.files[field])
+        for field in ("image", "audio", "pdf")
+        if field in request.files and request.files[field].filename
+    }
+    return text_content, files
+
+
+def _cleanup_uploads(uploads):
+    for upload in uploads:
+        upload.cleanup()
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    try:
+        return jsonify({"success": True, **get_cache_stats(), "perceptual": get_perceptual_index_stats()})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route("/models/stats", methods=["GET"])
+def model_stats():
+    try:
+        return jsonify({"success": True, **registry.stats(), "batching": get_batching_stats()})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @app.route("/process", methods=["POST"])
 def process_all():
     """Main endpoint that processes all UDL transformations"""
+    files = {}
     try:
-        text_content = ""
-        image_file = None
-        audio_file = None
-        pdf_file = None
-
-        if request.is_json:
-            data = request.get_json()
-            text_content = data.get("text", "")
-        else:
-            text_content = request.form.get("text", "")
-            
-            if "image" in request.files:
-                image_file = request.files["image"]
-            if "audio" in request.files:
-                audio_file = request.files["audio"]
-            if "pdf" in request.files:
-                pdf_file = request.files["pdf"]
+        text_content, files = _get_process_inputs()
+        results, timings = run_process_pipeline(
+            text_content, files.get("image"), files.get("audio"), files.get("pdf")
+        )
 
-        extracted_text = text_content
-        
-        if pdf_file and pdf_file.filename:
-            pdf_result = extract_text_from_pdf(pdf_file)
-            if pdf_result.get("success"):
-                extracted_text = pdf_result.get("text", "")
-        
-        if image_file and image_file.filename and not extracted_text:
-            ocr_result = extract_text_from_image(image_file)
-            if ocr_result.get("success"):
-                extracted_text = ocr_result.get("text", "")
-
-        if audio_file and audio_file.filename and not extracted_text:
-            audio_result = transcribe_audio(audio_file)
-            if audio_result.get("success"):
-                extracted_text = audio_result.get("transcript", "")
-
-        simplification_result = simplify_text(extracted_text)
-        simplified_text = simplification_result.get("simplified", extracted_text)
-        
-        results = {
-            "extraction": {
-                "text": extracted_text,
-                "source": "pdf" if pdf_file else "image" if image_file else "audio" if audio_file else "direct"
-            },
-            "simplification": simplification_result,
-            "translation": translate_text(simplified_text),
-            "similarity": compute_similarity(extracted_text, simplified_text),
-            "bias": detect_bias(extracted_text),
-            "wcag": check_wcag_compliance(extracted_text),
-            "signlanguage": generate_gloss(simplified_text),
-        }
-        
-        if image_file and image_file.filename:
-            image_file.seek(0)
-            results["alttext"] = generate_alt_text(image_file)
-        
-        if audio_file and audio_file.filename:
-            audio_file.seek(0)
-            results["transcript"] = transcribe_audio(audio_file)
+        return jsonify({"success": True, "results": results, "stage_timings": timings})
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+    finally:
+        _cleanup_uploads(files.values())
 
-        return jsonify({"success": True, "results": results})
 
+@app.route("/process/stream", methods=["POST"])
+def process_stream():
+    """Same as /process, but sends each stage result as an SSE event as soon as it is ready"""
+    files = {}
+    try:
+        # the stages run after this view returns, when the request's upload
+        # streams are closed; the Uploads have already captured their bytes
+        text_content, files = _get_process_inputs()
+        stages = build_process_stages(
+            text_content, files.get("image"), files.get("audio"), files.get("pdf")
+        )
     except Exception as e:
+        _cleanup_uploads(files.values())
         return jsonify({"success": False, "error": str(e)}), 500
 
+    def generate():
+        timings = {}
+        failed = []
+        try:
+            for name, result, elapsed in iter_stages(stages):
+                timings[name] = round(elapsed, 3)
+                if isinstance(result, dict) and result.get("success") is False and "error" in result:
+                    failed.append(name)
+                yield _sse_event("stage", {"stage": name, "result": result, "elapsed": timings[name]})
+        except Exception as e:
+            yield _sse_event("error", {"success": False, "error": str(e)})
+        finally:
+            _cleanup_uploads(files.values())
+
+        yield _sse_event("summary", {
+            "success": True,
+            "stages": [name for name in stages if name in timings],
+            "failed_stages": failed,
+            "stage_timings": timings
+        })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _wants_stream():
+    flag = request.args.get("stream") or request.form.get("stream") or ""
+    return flag.lower() in ("1", "true", "yes")
+
+
+def _stream_pdf_pages(pdf_file):
+    """Send each PDF page as a JSON line as soon as it is parsed, then a summary line"""
+    # capture the upload now: the request stream may be closed before the generator runs
+    upload = as_upload(pdf_file)
+
+    def generate():
+        info = {}
+        page_count = 0
+        ocr_pages = []
+        try:
+            for page in iter_pdf_pages(upload, info=info):
+                if page["text"]:
+                    page_count += 1
+                if page["method"] == "ocr":
+                    ocr_pages.append(page["page"])
+                yield json.dumps({"type": "page", **page}) + "\n"
+            yield json.dumps({
+                "type": "summary",
+                "success": True,
+                "page_count": page_count,
+                "total_pages": info.get("total_pages", 0),
+                "ocr_pages": ocr_pages,
+                "method": "pdfplumber+trocr" if ocr_pages else "pdfplumber",
+                "parallel": info.get("parallel", False)
+            }) + "\n"
+        except Exception as e:
+            print(f"❌ PDF streaming error: {str(e)}")
+            yield json.dumps({"type": "error", "success": False, "error": str(e)}) + "\n"
+        finally:
+            upload.cleanup()
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 
 @app.route("/process/extraction", methods=["POST"])
 def process_extraction():
@@ -121,7 +224,10 @@ def process_extraction():
             
             if "pdf" in request.files:
                 pdf_file = request.files["pdf"]
-                if pdf_file.filename:
+                if pdf_file.filename and _wants_stream():
+                    print(f"📄 Streaming PDF pages: {pdf_file.filename}")
+                    return _stream_pdf_pages(pdf_file)
+                elif pdf_file.filename:
                     print(f"📄 Processing PDF: {pdf_file.filename}")
                     result = extract_text_from_pdf(pdf_file)
                 else:
@@ -249,7 +355,13 @@ def process_bias():
     try:
         data = request.get_json() or {}
         text = data.get("text", "")
-        result = detect_bias(text)
+        mode = data.get("mode")
+        if mode and mode not in BIAS_MODES:
+            return jsonify({"success": False, "error": f"Unknown bias mode: {mode}. Choose from {', '.join(BIAS_MODES)}"}), 400
+        
+        # omit the default so the cache key matches /process's bias result for the same text
+        options = {"mode": mode} if mode else {}
+        result = detect_bias(text, **options)
         return jsonify({"success": True, "result": result})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -291,10 +403,17 @@ def process_alt_text():
             print("❌ No 'image' field in request.files")
             return jsonify({"success": False, "error": "No image provided"}), 400
         
+        try:
+            profile = _requested_profile()
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        
         image_file = request.files["image"]
         print(f"📷 Processing image: {image_file.filename}")
         
-        result = generate_alt_text(image_file)
+        # omit the default so the cache key matches /process's alt text for the same image
+        options = {"profile": profile} if profile else {}
+        result = generate_alt_text(image_file, **options)
         print(f"✅ Alt text result: {result.get('alt_text', 'N/A')[:100]}...")
         
         return jsonify({"success": True, "result": result})
@@ -305,6 +424,56 @@ def process_alt_text():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def _requested_profile():
+    """The decoding profile asked for by the request, or None; raises ValueError for unknown names"""
+    profile = request.form.get("profile") or request.args.get("profile")
+    if profile and profile not in FLORENCE_PROFILES:
+        raise ValueError(f"Unknown profile: {profile}. Choose from {', '.join(FLORENCE_PROFILES)}")
+    return profile
+
+
+@app.route("/process/alttext/batch", methods=["POST"])
+def process_alt_text_batch():
+    """Alt text for many images: repeated "images" fields and/or a zip under "archive", answered in input order"""
+    try:
+        profile = _requested_profile()
+        
+        uploads = [Upload(f) for f in request.files.getlist("images") if f.filename]
+        for archive in request.files.getlist("archive"):
+            if archive.filename:
+                # checked against the member list, before any image is unpacked
+                remaining = max(0, ALT_TEXT_BATCH_MAX_IMAGES - len(uploads))
+                uploads.extend(uploads_from_zip(archive, IMAGE_EXTENSIONS, max_files=remaining))
+        
+        if not uploads:
+            return jsonify({"success": False, "error": "No images provided"}), 400
+        if len(uploads) > ALT_TEXT_BATCH_MAX_IMAGES:
+            return jsonify({
+                "success": False,
+                "error": f"Too many images ({len(uploads)}), the limit is {ALT_TEXT_BATCH_MAX_IMAGES}"
+            }), 400
+        
+        import time
+        started = time.perf_counter()
+        print(f"🖼️ Batch alt text for {len(uploads)} image(s)")
+        results = generate_alt_text_batch(uploads, profile)
+        
+        return jsonify({
+            "success": True,
+            "count": len(results),
+            "failed": sum(1 for result in results if not result.get("success")),
+            "results": results,
+            "elapsed": round(time.perf_counter() - started, 3)
+        })
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        print(f"❌ Batch alt text error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @app.route("/process/transcript", methods=["POST"])
 def process_transcript():
     try:
@@ -319,9 +488,20 @@ def process_transcript():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def _release_video_upload(upload):
+    """Remove a video's spill file, retrying while Windows still has it open"""
+    import time
+
+    time.sleep(0.5)
+    for _ in range(3):
+        if upload.cleanup():
+            break
+        time.sleep(0.5)
+
+
 @app.route("/process/video", methods=["POST"])
 def process_video():
-    temp_path = None
+    upload = None
     try:
         if "video" not in request.files:
             return jsonify({"success": False, "error": "No video provided"}), 400
@@ -331,56 +511,35 @@ def process_video():
         if not video_file.filename:
             return jsonify({"success": False, "error": "Empty video file"}), 400
         
-        import tempfile
-        import time
-        temp_path = tempfile.mktemp(suffix=os.path.splitext(video_file.filename)[1])
-        video_file.save(temp_path)
+        # ffmpeg/moviepy read the video by filename
+        upload = as_upload(video_file)
         
         print(f"🎬 Processing video: {video_file.filename}")
         
-        result = process_video_for_accessibility(temp_path)
-        
-        time.sleep(0.5)
-        
-        if temp_path and os.path.exists(temp_path):
-            for _ in range(3):
-                try:
-                    os.remove(temp_path)
-                    break
-                except PermissionError:
-                    time.sleep(0.5)
+        result = process_video_for_accessibility(upload.path())
         
         return jsonify({"success": result.get("success", False), "result": result})
         
     except Exception as e:
         import traceback
         traceback.print_exc()
-        if temp_path and os.path.exists(temp_path):
-            try:
-                import time
-                time.sleep(0.5)
-                os.remove(temp_path)
-            except:
-                pass
         return jsonify({"success": False, "error": str(e)}), 500
+    finally:
+        if upload is not None:
+            _release_video_upload(upload)
 
 
 @app.route("/process/video/captions", methods=["POST"])
 def get_video_captions():
+    upload = None
     try:
         if "video" not in request.files:
             return jsonify({"success": False, "error": "No video provided"}), 400
         
         video_file = request.files["video"]
         
-        import tempfile
-        temp_path = tempfile.mktemp(suffix=os.path.splitext(video_file.filename)[1])
-        video_file.save(temp_path)
-        
-        result = transcribe_video(temp_path)
-        
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        upload = as_upload(video_file)
+        result = transcribe_video(upload.path())
         
         if result.get("success"):
             return jsonify({
@@ -395,6 +554,55 @@ def get_video_captions():
         
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
+    finally:
+        if upload is not None:
+            upload.cleanup()
+
+
+@app.route("/jobs/process", methods=["POST"])
+def submit_process_job():
+    """Queue the full /process pipeline and return a job id immediately"""
+    try:
+        text_content, files = _get_process_inputs()
+        job_id = submit_job("process", {"text": text_content}, files)
+        return jsonify({"success": True, "job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}), 202
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route("/jobs/process/video", methods=["POST"])
+def submit_video_job():
+    try:
+        if "video" not in request.files or not request.files["video"].filename:
+            return jsonify({"success": False, "error": "No video provided"}), 400
+
+        job_id = submit_job("video", files={"video": request.files["video"]})
+        return jsonify({"success": True, "job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}), 202
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route("/jobs/process/video/captions", methods=["POST"])
+def submit_video_captions_job():
+    try:
+        if "video" not in request.files or not request.files["video"].filename:
+            return jsonify({"success": False, "error": "No video provided"}), 400
+
+        job_id = submit_job("video_captions", files={"video": request.files["video"]})
+        return jsonify({"success": True, "job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}), 202
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job_status(job_id):
+    try:
+        job = get_job(job_id)
+        if job is None:
+            return jsonify({"success": False, "error": "Job not found"}), 404
+        return jsonify({"success": True, "job": job})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
 
 
 if __name__ == "__main__":
@@ -404,4 +612,8 @@ if __name__ == "__main__":
     print("Server running at: http://localhost:8000")
     print("Health check: http://localhost:8000/health")
     print("=" * 60)
-    app.run(host="0.0.0.0", port=8000, debug=True)
+    debug = True
+    # with the reloader on, this block runs in the watcher too; only the child that serves requests sets WERKZEUG_RUN_MAIN
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_services()
+    app.run(host="0.0.0.0", port=8000, debug=debug)
@@ -0,0 +1,121 @@
+import time
+import queue
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+class MicroBatcher:
+    """
+    Collects concurrent calls into batches for a single worker thread.
+
+    submit() queues an item and returns a Future. The worker takes the
+    first waiting item, keeps collecting until max_batch items are queued
+    or max_wait_ms has passed since that item arrived, then hands the
+    whole list to process(items), which must return one result per item.
+    Because only the worker calls process(), the model behind it is never
+    used by two threads at once.
+    """
+
+    def __init__(self, name, process, max_batch=8, max_wait_ms=10):
+        self.name = name
+        self.process = process
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._sizes = Counter()
+        self._waits = deque(maxlen=1000)
+        self._counters = {"batches": 0, "items": 0, "failed_batches": 0, "process_seconds": 0.0}
+
+    def submit(self, item):
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((time.monotonic(), item, future))
+        return future
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name=f"batcher-{self.name}", daemon=True)
+                    self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = batch[0][0] + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # the first item already waited long enough; take only what is ready
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            pending = [future for _, _, future in batch if future.set_running_or_notify_cancel()]
+            items = [item for _, item, future in batch if future in pending]
+
+            failed = False
+            if items:
+                try:
+                    results = self.process(items)
+                    for future, result in zip(pending, results):
+                        future.set_result(result)
+                except Exception as e:
+                    failed = True
+                    for future in pending:
+                        future.set_exception(e)
+
+            with self._lock:
+                self._counters["batches"] += 1
+                self._counters["items"] += len(items)
+                self._counters["failed_batches"] += int(failed)
+                self._counters["process_seconds"] += time.monotonic() - started
+                self._sizes[len(items)] += 1
+                self._waits.extend(started - enqueued for enqueued, _, _ in batch)
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            batches = self._counters["batches"]
+            return {
+                **self._counters,
+                "process_seconds": round(self._counters["process_seconds"], 3),
+                "max_batch": self.max_batch,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+                "queued": self._queue.qsize(),
+                "mean_batch_size": round(self._counters["items"] / batches, 2) if batches else 0.0,
+                "batch_sizes": dict(sorted(self._sizes.items())),
+                "queue_wait_ms": {
+                    "mean": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                    "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 2) if waits else 0.0,
+                    "max": round(waits[-1] * 1000, 2) if waits else 0.0,
+                },
+            }
+
+
+def get_batcher(name, process, **options):
+    """Return the process-wide batcher with this name, creating it on first use"""
+    with _batchers_lock:
+        if name not in _batchers:
+            _batchers[name] = MicroBatcher(name, process, **options)
+        return _batchers[name]
+
+
+def get_batching_stats():
+    with _batchers_lock:
+        batchers = dict(_batchers)
+    return {name: batcher.stats() for name, batcher in batchers.items()}
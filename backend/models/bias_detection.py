@@ -1,6 +1,16 @@
+import os
 import re
+import json
+import hashlib
+import threading
 from transformers import pipeline
 
+from .cache import CACHE_ENABLED, cached_stage, get_cache, make_key, normalize_text
+from .registry import registry
+from .onnx_backend import ONNX_BACKEND_ENABLED, OnnxTextClassifier
+from .rule_engine import RuleEngine
+from .bias_screen import screen_sentences, screen_tag
+
 # Optional spaCy
 try:
     import spacy
@@ -10,10 +20,20 @@ except ImportError:
     SPACY_AVAILABLE = False
     print("⚠️ spaCy not available - using transformer models only")
 
-_bias_model = None
-_toxicity_model = None
-_sentiment_model = None
-_nlp = None
+BIAS_MODEL_NAME = "cardiffnlp/twitter-roberta-base-hate-latest"
+TOXICITY_MODEL_NAME = "unitary/toxic-bert"
+SENTIMENT_MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+SPACY_MODEL_NAME = "en_core_web_sm"
+BIAS_SENTIMENT_BATCH_SIZE = int(os.getenv("BIAS_SENTIMENT_BATCH_SIZE", "16"))
+# per-sentence classifier outputs, keyed by (model id, normalized sentence)
+BIAS_SENTENCE_CACHE = CACHE_ENABLED and os.getenv("BIAS_SENTENCE_CACHE", "1") == "1"
+BIAS_SENTENCE_CACHE_ITEMS = int(os.getenv("BIAS_SENTENCE_CACHE_ITEMS", "20000"))
+BIAS_SENTENCE_CACHE_DISK_MB = int(os.getenv("BIAS_SENTENCE_CACHE_DISK_MB", "256"))
+# "full" runs every model on every sentence, "tiered" only on sentences the first-tier screen flags
+BIAS_MODES = ("full", "tiered")
+BIAS_MODE = os.getenv("BIAS_MODE", "full")
+# JSON file of extra DependencyMatcher patterns, same shape as DEPENDENCY_PATTERNS
+BIAS_DEPENDENCY_PATTERNS_PATH = os.getenv("BIAS_DEPENDENCY_PATTERNS_PATH", "")
 
 BIAS_PATTERNS = {
     "gender": {
@@ -204,49 +224,68 @@ BIAS_PATTERNS = {
 }
 
 
+DEPENDENCY_PATTERNS = {
+    "GENDER_ROLE_BIAS": {
+        "type": "gender_role_stereotype",
+        "severity": "high",
+        "confidence": 0.92,
+        "explanation": "Gender stereotyped role assignment detected",
+        "patterns": [[
+            {
+                "RIGHT_ID": "subject",
+                "RIGHT_ATTRS": {"LOWER": {"IN": ["women", "woman", "men", "man", "females", "males"]}}
+            },
+            {
+                "RIGHT_ID": "better",
+                "LEFT_ID": "subject",
+                "REL_OP": ">",
+                "RIGHT_ATTRS": {"LOWER": {"IN": ["better", "suited", "more", "naturally", "tend"]}}
+            },
+            {
+                "RIGHT_ID": "role",
+                "LEFT_ID": "better",
+                "REL_OP": ">",
+                "RIGHT_ATTRS": {"LOWER": {"IN": ["roles", "positions", "jobs", "suited"]}}
+            }
+        ]]
+    }
+}
+
+AGE_CONTEXT_PATTERNS = [
+    r'\b(young|millennial|gen z|current|today\'s)\b',
+    r'\b(past|previous|older)\s+generation',
+]
+
+EMOTION_STEREOTYPE_PATTERN = re.compile(r'(emotional|feelings|hormonal).*(interfere|affect|weaken|lower).*(decision|strategic|logical|rational)')
+
+_dependency_patterns = None
+_rule_engine = None
+_dependency_matchers = {}
+_dependency_matchers_lock = threading.Lock()
+
+
 def detect_gender_role_bias(doc):
     """Detect gender role stereotyping using dependency parsing (requires spaCy)"""
     if not SPACY_AVAILABLE:
         return []
-    
-    matcher = DependencyMatcher(doc.vocab)
-
-    pattern = [
-        {
-            "RIGHT_ID": "subject",
-            "RIGHT_ATTRS": {"LOWER": {"IN": ["women", "woman", "men", "man", "females", "males"]}}
-        },
-        {
-            "RIGHT_ID": "better",
-            "LEFT_ID": "subject",
-            "REL_OP": ">",
-            "RIGHT_ATTRS": {"LOWER": {"IN": ["better", "suited", "more", "naturally", "tend"]}}
-        },
-        {
-            "RIGHT_ID": "role",
-            "LEFT_ID": "better",
-            "REL_OP": ">",
-            "RIGHT_ATTRS": {"LOWER": {"IN": ["roles", "positions", "jobs", "suited"]}}
-        }
-    ]
-
-    matcher.add("GENDER_ROLE_BIAS", [pattern])
 
-    matches = matcher(doc)
+    matcher = load_dependency_matcher(doc.vocab)
+    patterns = get_dependency_patterns()
     flags = []
 
-    for match_id, token_ids in matches:
+    for match_id, token_ids in matcher(doc):
+        rule = patterns[doc.vocab.strings[match_id]]
         span_tokens = [doc[i] for i in token_ids]
         span_text = " ".join(t.text for t in span_tokens)
         flags.append({
-            "type": "gender_role_stereotype",
-            "severity": "high",
+            "type": rule.get("type", "gender_role_stereotype"),
+            "severity": rule.get("severity", "high"),
             "matched_text": span_text,
-            "confidence": 0.92,
-            "explanation": "Gender stereotyped role assignment detected"
+            "confidence": rule.get("confidence", 0.92),
+            "explanation": rule.get("explanation", "Gender stereotyped role assignment detected")
         })
 
-    if re.search(r'(emotional|feelings|hormonal).*(interfere|affect|weaken|lower).*(decision|strategic|logical|rational)', doc.text.lower()):
+    if EMOTION_STEREOTYPE_PATTERN.search(doc.text.lower()):
         flags.append({
             "type": "gender_emotion_stereotype",
             "severity": "high",
@@ -258,70 +297,232 @@ def detect_gender_role_bias(doc):
     return flags
 
 
+def _load_onnx_classifier(name, model_name, **kwargs):
+    """ONNX Runtime version of a classifier pipeline (BIAS_BACKEND=onnx); QUANTIZE_MODELS selects the int8 graph"""
+    def _load():
+        print(f"Loading {name} model with ONNX Runtime...")
+        model = OnnxTextClassifier(model_name, int8=registry.should_quantize(name), **kwargs)
+        print(f"{name.title()} ONNX model loaded successfully!")
+        return model
+    return registry.get(f"onnx:{name}", _load)
+
+
 def load_bias_model():
     """Load hate speech detection model"""
-    global _bias_model
-    if _bias_model is None:
+    if ONNX_BACKEND_ENABLED:
+        return _load_onnx_classifier("bias", BIAS_MODEL_NAME, top_k=None)
+
+    def _load():
         print("Loading bias detection model...")
-        _bias_model = pipeline(
+        model = pipeline(
             "text-classification",
-            model="cardiffnlp/twitter-roberta-base-hate-latest",
+            model=BIAS_MODEL_NAME,
             top_k=None
         )
         print("Bias detection model loaded successfully!")
-    return _bias_model
+        return model
+    return registry.get("bias", _load)
 
 
 def load_toxicity_model():
     """Load additional toxicity/bias model for enhanced detection"""
-    global _toxicity_model
-    if _toxicity_model is None:
+    if ONNX_BACKEND_ENABLED:
+        return _load_onnx_classifier("toxicity", TOXICITY_MODEL_NAME, top_k=None)
+
+    def _load():
         print("Loading toxicity detection model...")
-        _toxicity_model = pipeline(
+        model = pipeline(
             "text-classification",
-            model="unitary/toxic-bert",
+            model=TOXICITY_MODEL_NAME,
             top_k=None
         )
         print("Toxicity detection model loaded successfully!")
-    return _toxicity_model
+        return model
+    return registry.get("toxicity", _load)
 
 
 def load_sentiment_model():
     """Load sentiment analysis model"""
-    global _sentiment_model
-    if _sentiment_model is None:
+    if ONNX_BACKEND_ENABLED:
+        return _load_onnx_classifier("sentiment", SENTIMENT_MODEL_NAME)
+
+    def _load():
         print("Loading sentiment analysis model...")
-        _sentiment_model = pipeline(
+        model = pipeline(
             "sentiment-analysis",
-            model="cardiffnlp/twitter-roberta-base-sentiment-latest"
+            model=SENTIMENT_MODEL_NAME
         )
         print("Sentiment analysis model loaded successfully!")
-    return _sentiment_model
+        return model
+    return registry.get("sentiment", _load)
 
 
 def load_nlp():
     """Load spaCy NLP model (optional - for enhanced detection)"""
-    global _nlp
     if not SPACY_AVAILABLE:
         return None
-    if _nlp is None:
-        try:
+    try:
+        def _load():
             print("Loading spaCy NLP model...")
-            _nlp = spacy.load("en_core_web_sm")
+            nlp = spacy.load(SPACY_MODEL_NAME)
             print("spaCy NLP model loaded successfully!")
-        except Exception as e:
-            print(f"⚠️ Could not load spaCy model: {e}")
-            print("Continuing with transformer models only...")
-            return None
-    return _nlp
+            return nlp
+        return registry.get("spacy", _load)
+    except Exception as e:
+        print(f"⚠️ Could not load spaCy model: {e}")
+        print("Continuing with transformer models only...")
+        return None
+
 
+def get_dependency_patterns():
+    """DEPENDENCY_PATTERNS plus any rules from BIAS_DEPENDENCY_PATTERNS_PATH, read once"""
+    global _dependency_patterns
+    if _dependency_patterns is None:
+        patterns = dict(DEPENDENCY_PATTERNS)
+        if BIAS_DEPENDENCY_PATTERNS_PATH:
+            try:
+                with open(BIAS_DEPENDENCY_PATTERNS_PATH, "r", encoding="utf-8") as f:
+                    patterns.update(json.load(f))
+            except Exception as e:
+                print(f"⚠️ Could not load dependency patterns from {BIAS_DEPENDENCY_PATTERNS_PATH}: {e}")
+        _dependency_patterns = patterns
+    return _dependency_patterns
+
+
+def load_dependency_matcher(vocab):
+    """
+    The DependencyMatcher for a spaCy vocab, built once with every dependency pattern.
+
+    Matchers are kept per vocab, so a spaCy model reloaded after registry
+    eviction gets a new one; only the latest few vocabs are kept.
+    """
+    with _dependency_matchers_lock:
+        entry = _dependency_matchers.get(id(vocab))
+        if entry is None or entry[0] is not vocab:
+            matcher = DependencyMatcher(vocab)
+            for label, rule in get_dependency_patterns().items():
+                try:
+                    matcher.add(label, rule["patterns"])
+                except Exception as e:
+                    print(f"⚠️ Skipping dependency pattern {label}: {e}")
+            entry = _dependency_matchers[id(vocab)] = (vocab, matcher)
+            while len(_dependency_matchers) > 4:
+                _dependency_matchers.pop(next(iter(_dependency_matchers)))
+        return entry[1]
+
+
+def _classify_batched(model, texts, batch_size):
+    """
+    Run a classifier pipeline over a list of texts in batches, shortest first.
 
-def detect_bias(text):
+    Sorting by length keeps sentences of similar size in the same batch so
+    little padding is added; results are returned in the original order.
+    """
+    if not texts:
+        return []
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    results = [None] * len(texts)
+    for i, result in zip(order, model([texts[i] for i in order], batch_size=batch_size)):
+        results[i] = result
+    return results
+
+
+def _normalize_sentence(sentence):
+    return " ".join(normalize_text(sentence).split())
+
+
+def _classify_sentences(name, model_name, load_model, sentences, classify=None):
+    """
+    Classifier output for each sentence, reusing earlier results from the sentence cache.
+
+    Sentences are looked up by (model id, normalized sentence), where
+    normalization is NFC plus collapsed whitespace; the first original
+    sentence behind each distinct miss is sent to the model, in one call,
+    and the model is not loaded at all when everything hits. Hits and
+    misses per model show up under "sentences" in /cache/stats.
+    """
+    if not sentences:
+        return []
+    classify = classify or (lambda model, batch: model(batch))
+    if not BIAS_SENTENCE_CACHE:
+        return classify(load_model(), sentences)
+
+    cache = get_cache(
+        "sentences",
+        memory_items=BIAS_SENTENCE_CACHE_ITEMS,
+        max_disk_bytes=BIAS_SENTENCE_CACHE_DISK_MB * 1024 * 1024
+    )
+    model_id = f"{model_name}{_backend_tag(name)}"
+    texts = [_normalize_sentence(sentence) for sentence in sentences]
+    keys, originals, outputs = {}, {}, {}
+    for text, sentence in zip(texts, sentences):
+        if text not in keys:
+            keys[text] = make_key("sentence", model_id, [text], {})
+            hit, value = cache.get(keys[text], stage=name)
+            if hit:
+                outputs[text] = value
+            else:
+                originals[text] = sentence
+
+    if originals:
+        misses = list(originals)
+        for text, value in zip(misses, classify(load_model(), [originals[text] for text in misses])):
+            outputs[text] = value
+            cache.set(keys[text], value)
+
+    return [outputs[text] for text in texts]
+
+
+def _backend_tag(name):
+    return ("+onnx" if ONNX_BACKEND_ENABLED else "") + registry.precision_tag(name)
+
+
+def _needs_models(sentence):
+    """First-tier check for tiered mode: a rule, age or emotion cue in the sentence"""
+    sentence_lower = sentence.lower()
+    return (
+        get_rule_engine().matches(sentence_lower)
+        or any(re.search(pattern, sentence_lower) for pattern in AGE_CONTEXT_PATTERNS)
+        or EMOTION_STEREOTYPE_PATTERN.search(sentence_lower) is not None
+    )
+
+
+def _patterns_tag():
+    """Changes with the configured dependency patterns so cached results from other rule sets aren't reused"""
+    if not BIAS_DEPENDENCY_PATTERNS_PATH:
+        return ""
+    encoded = json.dumps(get_dependency_patterns(), sort_keys=True).encode("utf-8")
+    return f":rules-{hashlib.sha256(encoded).hexdigest()[:12]}"
+
+
+def detect_bias(text, mode=None):
     """
     Main bias detection function using multiple models and techniques.
     
     Returns comprehensive bias analysis with scores, categories, and suggestions.
+    mode is "full" or "tiered" (default BIAS_MODE); tiered runs the
+    transformer and spaCy models only on sentences picked by the rules and
+    the linear screen, and reports the escalated share under "tiering".
+    Without a trained screen tiered escalates every sentence, and
+    "tiering" reports "screen": "none".
     """
+    mode = mode or BIAS_MODE
+    if mode not in BIAS_MODES:
+        raise ValueError(f"Unknown bias mode: {mode}. Choose from {', '.join(BIAS_MODES)}")
+    # only tiered runs depend on the screen, so retraining it leaves full-mode results cached
+    return _detect_bias(text, mode, screen_tag() if mode == "tiered" else "")
+
+
+@cached_stage(
+    "bias",
+    model_id=lambda: (
+        f"twitter-roberta-base-hate-latest{_backend_tag('bias')}"
+        f"+toxic-bert{_backend_tag('toxicity')}"
+        f"+twitter-roberta-base-sentiment-latest{_backend_tag('sentiment')}+en_core_web_sm{_patterns_tag()}"
+    )
+)
+def _detect_bias(text, mode, screen):
+    """detect_bias for a resolved mode; screen identifies the trained screen in the cache key ("" when unused)"""
     if not text or not text.strip():
         return {"success": False, "error": "No text provided"}
 
@@ -344,12 +545,25 @@ def detect_bias(text):
     bias_scores = []
     toxicity_scores = []
 
-    hate_model = load_bias_model()
-    toxicity_model = load_toxicity_model()
-    hate_preds = hate_model(sentences)
-    toxicity_preds = toxicity_model(sentences)
+    if mode == "tiered":
+        escalate = screen_sentences(sentences, _needs_models)
+        model_sentences = [sent for sent, escalated in zip(sentences, escalate) if escalated]
+        results["tiering"] = {
+            "mode": mode,
+            "screen": "trained" if screen else "none",
+            "sentences": len(sentences),
+            "escalated": len(model_sentences),
+            "escalation_rate": round(len(model_sentences) / len(sentences), 3)
+        }
+        nlp_text = " ".join(model_sentences)
+    else:
+        model_sentences = sentences
+        nlp_text = text
 
-    for idx, (hate_pred, tox_pred, sent) in enumerate(zip(hate_preds, toxicity_preds, sentences)):
+    hate_preds = _classify_sentences("bias", BIAS_MODEL_NAME, load_bias_model, model_sentences)
+    toxicity_preds = _classify_sentences("toxicity", TOXICITY_MODEL_NAME, load_toxicity_model, model_sentences)
+
+    for idx, (hate_pred, tox_pred, sent) in enumerate(zip(hate_preds, toxicity_preds, model_sentences)):
         for p in hate_pred:
             if p["label"].lower() in ["label_1", "hate"] and p["score"] > 0.4:  #Lowered from 0.5
                 bias_scores.append(p["score"])
@@ -375,12 +589,11 @@ def detect_bias(text):
                     results["categories"].append("toxicity")
 
     #if spacy- enhanced contextual NLP detection
-    nlp = load_nlp()
+    nlp = load_nlp() if nlp_text else None
     contextual_flags = 0
     
     if nlp is not None:
-        doc = nlp(text)
-        sentiment_model = load_sentiment_model()
+        doc = nlp(nlp_text)
 
         entity_bias_keywords = {
             'PERSON': ['stereotype', 'bias'],
@@ -389,32 +602,35 @@ def detect_bias(text):
             'DATE': ['young', 'old', 'generation', 'past', 'today']
         }
 
-        age_patterns = [
-            r'\b(young|millennial|gen z|current|today\'s)\b',
-            r'\b(past|previous|older)\s+generation',
-        ]
-
+        candidates = []
         for sent in doc.sents:
             entities = [(ent.text, ent.label_) for ent in sent.ents if ent.label_ in ['PERSON', 'NORP', 'ORG', 'GPE', 'DATE']]
-            has_age_context = any(re.search(pattern, sent.text.lower()) for pattern in age_patterns)
+            has_age_context = any(re.search(pattern, sent.text.lower()) for pattern in AGE_CONTEXT_PATTERNS)
             if entities or has_age_context:
-                sentiment = sentiment_model(sent.text)[0]
-                if sentiment['label'] == 'LABEL_0' and sentiment['score'] > 0.5:
-                    has_bias_context = any(any(kw in sent.text.lower() for kw in entity_bias_keywords.get(label, [])) for _, label in entities)
-                    if has_age_context:
-                        has_bias_context = True
-                    severity = "high" if has_bias_context and sentiment['score'] > 0.7 else "medium"
-                    results["flags"].append({
-                        "type": "contextual_bias",
-                        "matched_text": sent.text.strip(),
-                        "severity": severity,
-                        "entities": [e[0] for e in entities] + (["age_context"] if has_age_context else []),
-                        "confidence": round(sentiment['score'], 2)
-                    })
-                    category = "contextual_age" if has_age_context else "contextual"
-                    if category not in results["categories"]:
-                        results["categories"].append(category)
-                    contextual_flags += 1
+                candidates.append((sent, entities, has_age_context))
+
+        sentiments = _classify_sentences(
+            "sentiment", SENTIMENT_MODEL_NAME, load_sentiment_model, [sent.text for sent, _, _ in candidates],
+            lambda model, texts: _classify_batched(model, texts, BIAS_SENTIMENT_BATCH_SIZE)
+        )
+
+        for (sent, entities, has_age_context), sentiment in zip(candidates, sentiments):
+            if sentiment['label'] == 'LABEL_0' and sentiment['score'] > 0.5:
+                has_bias_context = any(any(kw in sent.text.lower() for kw in entity_bias_keywords.get(label, [])) for _, label in entities)
+                if has_age_context:
+                    has_bias_context = True
+                severity = "high" if has_bias_context and sentiment['score'] > 0.7 else "medium"
+                results["flags"].append({
+                    "type": "contextual_bias",
+                    "matched_text": sent.text.strip(),
+                    "severity": severity,
+                    "entities": [e[0] for e in entities] + (["age_context"] if has_age_context else []),
+                    "confidence": round(sentiment['score'], 2)
+                })
+                category = "contextual_age" if has_age_context else "contextual"
+                if category not in results["categories"]:
+                    results["categories"].append(category)
+                contextual_flags += 1
 
         if SPACY_AVAILABLE:
             gender_flags = detect_gender_role_bias(doc)
@@ -442,34 +658,36 @@ def detect_bias(text):
     return results
 
 
+def get_rule_engine():
+    """BIAS_PATTERNS compiled into a RuleEngine, built on first use"""
+    global _rule_engine
+    if _rule_engine is None:
+        _rule_engine = RuleEngine(BIAS_PATTERNS)
+    return _rule_engine
+
+
 def _rule_based_bias_detection(text):
     """Rule-based pattern matching for known bias indicators"""
     flags, suggestions, categories = [], [], []
     text_lower = text.lower()
 
-    for bias_type, config in BIAS_PATTERNS.items():
-        for pattern in config["patterns"]:
-            matches = list(re.finditer(pattern, text_lower))
-            for match in matches:
-                matched = match.group(0)
-                flag_type = f"{bias_type}_generational" if bias_type == "age" and "generation" in matched else bias_type
-                flags.append({
-                    "type": flag_type,
-                    "matched_text": matched,
-                    "severity": "high" if bias_type in ["disability", "racial", "sexual_orientation", "religion", "age"] else "medium"
-                })
-                if flag_type not in categories:
-                    categories.append(flag_type)
-
-                for term, repl in config.get("suggestions", {}).items():
-                    if re.search(re.escape(term), matched, re.IGNORECASE):
-                        suggested = re.sub(re.escape(term), repl, matched, flags=re.IGNORECASE)
-                        suggestions.append({
-                            "original": matched,
-                            "suggested": suggested,
-                            "type": bias_type
-                        })
-                        break
+    for bias_type, matched, suggestion in get_rule_engine().scan(text_lower):
+        flag_type = f"{bias_type}_generational" if bias_type == "age" and "generation" in matched else bias_type
+        flags.append({
+            "type": flag_type,
+            "matched_text": matched,
+            "severity": "high" if bias_type in ["disability", "racial", "sexual_orientation", "religion", "age"] else "medium"
+        })
+        if flag_type not in categories:
+            categories.append(flag_type)
+
+        if suggestion:
+            original, suggested = suggestion
+            suggestions.append({
+                "original": original,
+                "suggested": suggested,
+                "type": bias_type
+            })
 
     return {
         "flags": flags,
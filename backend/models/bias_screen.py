@@ -0,0 +1,105 @@
+import os
+import re
+import zlib
+import hashlib
+import threading
+
+from .cache import CACHE_DIR
+
+BIAS_SCREEN_MODEL_PATH = os.getenv("BIAS_SCREEN_MODEL_PATH", os.path.join(CACHE_DIR, "bias_screen.npz"))
+# probability above which the linear screen sends a sentence on to the transformer models
+BIAS_SCREEN_THRESHOLD = float(os.getenv("BIAS_SCREEN_THRESHOLD", "0.3"))
+BIAS_SCREEN_FEATURES = 2 ** 18
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+_screen = None
+_screen_key = None
+_screen_lock = threading.Lock()
+_warned_missing = False
+
+
+def hashed_features(text, n_features=BIAS_SCREEN_FEATURES):
+    """Bag of hashed unigrams and bigrams as {bucket: count}; shared by training and inference"""
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    features = {}
+    for gram in grams:
+        bucket = zlib.crc32(gram.encode("utf-8")) % n_features
+        features[bucket] = features.get(bucket, 0) + 1
+    return features
+
+
+class LinearScreen:
+    """
+    Logistic regression over hashed n-grams, used to pick sentences worth running the transformer models on.
+
+    The weights come from evaluation/train_bias_screen.py, which distils
+    the full detect_bias pipeline into this model. Scoring a sentence is
+    a handful of dictionary and array lookups.
+    """
+
+    def __init__(self, path):
+        import numpy as np
+
+        with np.load(path) as data:
+            self.weights = data["weights"].astype(np.float64)
+            self.bias = float(data["bias"])
+        self.n_features = len(self.weights)
+        with open(path, "rb") as f:
+            self.version = hashlib.sha256(f.read()).hexdigest()[:12]
+
+    def score(self, text):
+        import math
+
+        z = self.bias + sum(self.weights[bucket] * count for bucket, count in hashed_features(text, self.n_features).items())
+        return 1 / (1 + math.exp(-max(-60.0, min(60.0, z))))
+
+
+def load_screen():
+    """The trained LinearScreen at BIAS_SCREEN_MODEL_PATH, reloaded when the file changes; None if there is none"""
+    global _screen, _screen_key
+    try:
+        stat = os.stat(BIAS_SCREEN_MODEL_PATH)
+    except OSError:
+        return None
+
+    key = (stat.st_mtime_ns, stat.st_size)
+    with _screen_lock:
+        if _screen_key != key:
+            try:
+                _screen = LinearScreen(BIAS_SCREEN_MODEL_PATH)
+            except Exception as e:
+                print(f"⚠️ Could not load bias screen model: {e}")
+                _screen = None
+            _screen_key = key
+        return _screen
+
+
+def screen_sentences(sentences, rule_hit, threshold=BIAS_SCREEN_THRESHOLD):
+    """
+    First tier of tiered bias detection: which sentences need the transformer models.
+
+    A sentence is escalated when rule_hit(sentence) is true (a bias rule
+    or contextual cue matches) or the linear screen scores it at or above
+    threshold. Rules alone miss most of what the models catch, so without
+    a trained screen every sentence is escalated (the same work as full
+    mode) and a warning is printed once.
+    """
+    global _warned_missing
+    screen = load_screen()
+    if screen is None:
+        if not _warned_missing:
+            _warned_missing = True
+            print(
+                f"⚠️ No bias screen at {BIAS_SCREEN_MODEL_PATH}: tiered bias detection runs the models on every "
+                f"sentence. Train one with evaluation/train_bias_screen.py"
+            )
+        return [True] * len(sentences)
+    return [rule_hit(sentence) or screen.score(sentence) >= threshold for sentence in sentences]
+
+
+def screen_tag():
+    """Identifies the trained screen in cache keys, "" when there is none"""
+    screen = load_screen()
+    return f"+screen-{screen.version}" if screen is not None else ""
@@ -0,0 +1,389 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import contextvars
+import threading
+import functools
+import unicodedata
+from collections import OrderedDict
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+CACHE_MEMORY_ITEMS = int(os.getenv("CACHE_MEMORY_ITEMS", "256"))
+CACHE_DISK_MAX_MB = int(os.getenv("CACHE_DISK_MAX_MB", "1024"))
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+# set for the duration of one /process run (see pipeline.iter_stages)
+_request_memo = contextvars.ContextVar("request_memo", default=None)
+
+
+class ResultCache:
+    """
+    Two-tier cache of JSON-serializable values.
+
+    The memory tier is an LRU of serialized entries, so every hit hands back
+    a fresh copy that callers are free to mutate. The disk tier stores one
+    file per key and evicts the least recently used files once it grows
+    past max_disk_bytes. Both tiers honour per-entry TTLs.
+    """
+
+    def __init__(self, name, memory_items=CACHE_MEMORY_ITEMS, disk_dir=None,
+                 max_disk_bytes=CACHE_DISK_MAX_MB * 1024 * 1024, ttl=CACHE_TTL_SECONDS):
+        self.name = name
+        self.memory_items = memory_items
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "expired": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+        self._stage_stats = {}
+
+    def _count(self, field, stage=None):
+        self._stats[field] += 1
+        if stage:
+            stage_stats = self._stage_stats.setdefault(stage, {"hits": 0, "misses": 0})
+            stage_stats["misses" if field == "misses" else "hits"] += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def get(self, key, stage=None):
+        """Return (True, value) on a hit and (False, None) on a miss"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._count("memory_hits", stage)
+                    return True, json.loads(payload)
+                del self._memory[key]
+                self._stats["expired"] += 1
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    expires_at, payload = json.load(f)
+                if expires_at is None or expires_at > now:
+                    os.utime(path, None)
+                    with self._lock:
+                        self._remember(key, expires_at, payload)
+                        self._count("disk_hits", stage)
+                    return True, json.loads(payload)
+                self._remove_disk_entry(path)
+                with self._lock:
+                    self._stats["expired"] += 1
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"⚠️ Cache read failed for {self.name}: {e}")
+
+        with self._lock:
+            self._count("misses", stage)
+        return False, None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        payload = json.dumps(value, default=str)
+
+        with self._lock:
+            self._remember(key, expires_at, payload)
+            self._stats["stores"] += 1
+
+        if self.disk_dir:
+            self._write_disk_entry(key, expires_at, payload)
+
+    def _remember(self, key, expires_at, payload):
+        self._memory[key] = (expires_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+            self._stats["memory_evictions"] += 1
+
+    def _write_disk_entry(self, key, expires_at, payload):
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump([expires_at, payload], f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"⚠️ Cache write failed for {self.name}: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += size
+            over_budget = self._disk_bytes > self.max_disk_bytes
+
+        if over_budget:
+            self._evict_disk()
+
+    def _remove_disk_entry(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes -= size
+
+    def _list_disk_entries(self):
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for filename in files:
+                if filename.endswith(".json"):
+                    path = os.path.join(root, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _scan_disk_bytes(self):
+        return sum(size for _, size, _ in self._list_disk_entries())
+
+    def _evict_disk(self):
+        """Drop expired and least recently used files until under 90% of the budget"""
+        entries = sorted(self._list_disk_entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        evicted = 0
+
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                evicted += 1
+            except OSError:
+                pass
+
+        with self._lock:
+            self._disk_bytes = total
+            self._stats["disk_evictions"] += evicted
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.disk_dir:
+            for _, _, path in self._list_disk_entries():
+                self._remove_disk_entry(path)
+            self._disk_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hits": hits,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+                "stages": {
+                    stage: {**counts, "hit_rate": round(counts["hits"] / (counts["hits"] + counts["misses"]), 4)}
+                    for stage, counts in self._stage_stats.items()
+                },
+            }
+
+
+def get_cache(name, **options):
+    """Return the process-wide cache with this name, creating it on first use"""
+    with _caches_lock:
+        if name not in _caches:
+            options.setdefault("disk_dir", os.path.join(CACHE_DIR, name))
+            _caches[name] = ResultCache(name, **options)
+        return _caches[name]
+
+
+def get_cache_stats():
+    with _caches_lock:
+        caches = dict(_caches)
+    return {
+        "enabled": CACHE_ENABLED,
+        "caches": {name: cache.stats() for name, cache in caches.items()}
+    }
+
+
+def normalize_text(text):
+    return unicodedata.normalize("NFC", text).replace("\r\n", "\n")
+
+
+def digest_file(file_obj):
+    """sha256 of an upload, file-like object or path, leaving file objects rewound"""
+    if hasattr(file_obj, "digest"):
+        return file_obj.digest()
+
+    hasher = hashlib.sha256()
+
+    if isinstance(file_obj, (str, os.PathLike)):
+        with open(file_obj, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    stream = getattr(file_obj, "stream", file_obj)
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+        hasher.update(chunk)
+    stream.seek(0)
+    return hasher.hexdigest()
+
+
+def _digest_value(value):
+    if isinstance(value, str):
+        return "text:" + hashlib.sha256(normalize_text(value).encode("utf-8")).hexdigest()
+    if isinstance(value, bytes):
+        return "bytes:" + hashlib.sha256(value).hexdigest()
+    return value
+
+
+def make_key(stage, model_id, inputs, params):
+    payload = json.dumps([stage, model_id, inputs, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cached_stage(stage, model_id=None, ttl=None, file_input=False, cache_name="results", cacheable=None):
+    """
+    Cache a model stage's result, keyed by (stage, input, model id, parameters).
+
+    The first positional argument is the stage input: its content is hashed
+    (file bytes when file_input is True, normalized text otherwise) and the
+    remaining arguments are treated as parameters. model_id may be a callable
+    for stages whose backing model depends on configuration. Only results
+    with "success": True are stored, so failures are always retried; stages
+    with fallbacks pass cacheable, a predicate that rejects results the
+    model named by model_id did not produce, so those are retried as well.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not CACHE_ENABLED or not args:
+                return func(*args, **kwargs)
+
+            try:
+                if file_input:
+                    primary = "file:" + digest_file(args[0])
+                else:
+                    primary = _digest_value(args[0])
+                rest = [_digest_value(arg) for arg in args[1:]]
+                params = {k: _digest_value(v) for k, v in kwargs.items()}
+                current_model = model_id() if callable(model_id) else model_id
+                key = make_key(stage, current_model, [primary, *rest], params)
+            except Exception as e:
+                print(f"⚠️ Could not build cache key for {stage}: {e}")
+                return func(*args, **kwargs)
+
+            cache = get_cache(cache_name)
+            hit, value = cache.get(key, stage=stage)
+            if hit:
+                print(f"⚡ Cache hit for {stage}")
+                return value
+
+            result = func(*args, **kwargs)
+            if isinstance(result, dict) and result.get("success") and (cacheable is None or cacheable(result)):
+                cache.set(key, result, ttl=ttl)
+            return result
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+
+class RequestMemo:
+    """
+    Results computed during one request, shared by all of its stages.
+
+    Unlike ResultCache nothing is serialized or persisted: entries live as
+    long as the request. Concurrent callers asking for the same key wait
+    for the first one instead of computing it again.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._values:
+                    return self._values[key]
+            value = compute()
+            with self._lock:
+                self._values[key] = value
+            return value
+
+
+def current_request_memo():
+    return _request_memo.get()
+
+
+def bind_request_memo(memo):
+    """A copy of the current context with memo active, for running a stage on another thread"""
+    context = contextvars.copy_context()
+    context.run(_request_memo.set, memo)
+    return context
+
+
+def request_memoized(name, file_input=False):
+    """
+    Run a function at most once per distinct input within the current request.
+
+    Keys are built like cached_stage keys, so a file is identified by its
+    content hash rather than the object passed in. Outside a request memo
+    the function is called directly. Callers get their own deep copy of
+    the result.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            memo = _request_memo.get()
+            if memo is None or not args:
+                return func(*args, **kwargs)
+
+            try:
+                primary = "file:" + digest_file(args[0]) if file_input else _digest_value(args[0])
+                rest = [_digest_value(arg) for arg in args[1:]]
+                params = {k: _digest_value(v) for k, v in kwargs.items()}
+                key = make_key(name, None, [primary, *rest], params)
+            except Exception as e:
+                print(f"⚠️ Could not build request memo key for {name}: {e}")
+                return func(*args, **kwargs)
+
+            return copy.deepcopy(memo.get_or_compute(key, lambda: func(*args, **kwargs)))
+
+        return wrapper
+    return decorator
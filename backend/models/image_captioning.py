@@ -1,9 +1,15 @@
 import os
-import tempfile
+import copy
+import time
 import torch
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-_florence_processor = None
-_florence_model = None
+from .cache import cached_stage, request_memoized
+from .batching import get_batcher
+from .image_hash import PHASH_ENABLED, phash, get_perceptual_index
+from .image_prep import prepare_image
+from .registry import registry
+from .uploads import as_upload
 
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 
@@ -12,52 +18,97 @@ if DEVICE == "cpu":
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 
+FLORENCE_MODEL_NAME = "microsoft/Florence-2-base"
 
-def load_florence_model():
-    """Load the Florence-2 model"""
-    global _florence_processor, _florence_model
+# "fast" decodes greedily with the KV cache; "quality" is the original beam search
+FLORENCE_PROFILES = {
+    "fast": {"num_beams": 1, "max_new_tokens": 128, "use_cache": True},
+    "quality": {"num_beams": 3, "max_new_tokens": 512, "use_cache": False},
+}
+FLORENCE_PROFILE = os.getenv("FLORENCE_PROFILE", "quality")
+
+# concurrent caption requests are queued and decoded together by one worker thread
+FLORENCE_BATCHING = os.getenv("FLORENCE_BATCHING", "1") == "1"
+FLORENCE_BATCH_MAX_IMAGES = int(os.getenv("FLORENCE_BATCH_MAX_IMAGES", "8"))
+FLORENCE_BATCH_WAIT_MS = int(os.getenv("FLORENCE_BATCH_WAIT_MS", "10"))
+
+ALT_TEXT_TASKS = ("<CAPTION>", "<DETAILED_CAPTION>", "<OCR>")
+ALT_TEXT_BATCH_WORKERS = int(os.getenv("ALT_TEXT_BATCH_WORKERS", "4"))
+GROQ_CONCURRENCY = int(os.getenv("GROQ_CONCURRENCY", "4"))
+
+
+def _load_florence():
+    from transformers import AutoProcessor, AutoModelForCausalLM
+    
+    print(f"🖼️ Loading Florence-2 model: {FLORENCE_MODEL_NAME}...")
+    
+    processor = AutoProcessor.from_pretrained(
+        FLORENCE_MODEL_NAME, 
+        trust_remote_code=True
+    )
     
-    if _florence_model is None:
+    model = AutoModelForCausalLM.from_pretrained(
+        FLORENCE_MODEL_NAME,
+        torch_dtype=torch.float32,
+        trust_remote_code=True,
+        low_cpu_mem_usage=True,
+        attn_implementation="eager"
+    ).to(DEVICE).eval()
+    
+    print(f"✅ Florence-2 model loaded on {DEVICE}!")
+    return processor, model
+
+
+def get_decoding_profile(profile=None):
+    """Resolve a profile name (None means the FLORENCE_PROFILE default) to its name and generate() settings"""
+    name = profile or FLORENCE_PROFILE
+    if name not in FLORENCE_PROFILES:
+        raise ValueError(f"Unknown decoding profile: {name}. Choose from {', '.join(FLORENCE_PROFILES)}")
+    return name, FLORENCE_PROFILES[name]
+
+
+def _florence_generate(generate, profile, **inputs):
+    """Call generate with a profile's settings, retrying without the KV cache if the model's remote code rejects it"""
+    _, settings = get_decoding_profile(profile)
+    with torch.no_grad():
         try:
-            from transformers import AutoProcessor, AutoModelForCausalLM
-            
-            model_name = "microsoft/Florence-2-base"
-            print(f"🖼️ Loading Florence-2 model: {model_name}...")
-            
-            _florence_processor = AutoProcessor.from_pretrained(
-                model_name, 
-                trust_remote_code=True
-            )
-            
-            _florence_model = AutoModelForCausalLM.from_pretrained(
-                model_name,
-                torch_dtype=torch.float32,
-                trust_remote_code=True,
-                low_cpu_mem_usage=True,
-                attn_implementation="eager"
-            ).to(DEVICE).eval()
-            
-            print(f"✅ Florence-2 model loaded on {DEVICE}!")
-            
+            return generate(**inputs, do_sample=False, **settings)
         except Exception as e:
-            print(f"❌ Error loading Florence-2 model: {e}")
-            import traceback
-            traceback.print_exc()
-            return None, None
-    
-    return _florence_processor, _florence_model
+            if not settings["use_cache"]:
+                raise
+            print(f"⚠️ Florence-2 generate failed with the KV cache ({e}), retrying without it")
+            return generate(**inputs, do_sample=False, **{**settings, "use_cache": False})
 
 
-def generate_florence_caption(image, task="<DETAILED_CAPTION>"):
+def load_florence_model():
+    """Load the Florence-2 model"""
+    try:
+        return registry.get("florence-2", _load_florence)
+    except Exception as e:
+        print(f"❌ Error loading Florence-2 model: {e}")
+        import traceback
+        traceback.print_exc()
+        return None, None
+
+
+def generate_florence_caption(image, task="<DETAILED_CAPTION>", profile=None):
     """
     Generate caption using Florence-2 model.
     
+    profile is a FLORENCE_PROFILES name (default FLORENCE_PROFILE).
+    Concurrent callers are batched together (see generate_florence_captions).
+    
     Tasks:
     - <CAPTION>: Brief caption
     - <DETAILED_CAPTION>: Detailed caption
     - <MORE_DETAILED_CAPTION>: Very detailed caption
     - <OCR>: Extract text from image
     """
+    return generate_florence_captions(image, (task,), profile=profile).get(task)
+
+
+def _generate_florence_single(image, task, profile=None):
+    """One task, one image, Florence-2's own generate(): the fallback when batched decoding fails"""
     processor, model = load_florence_model()
     if model is None:
         return None
@@ -68,28 +119,15 @@ def generate_florence_caption(image, task="<DETAILED_CAPTION>"):
         input_ids = inputs["input_ids"].to(DEVICE)
         pixel_values = inputs["pixel_values"].to(DEVICE)
         
-        with torch.no_grad():
-            generated_ids = model.generate(
-                input_ids=input_ids,
-                pixel_values=pixel_values,
-                max_new_tokens=512,
-                num_beams=3,
-                do_sample=False,
-                use_cache=False
-            )
+        generated_ids = _florence_generate(
+            model.generate, profile,
+            input_ids=input_ids,
+            pixel_values=pixel_values
+        )
         
         generated_text = processor.batch_decode(generated_ids, skip_special_tokens=False)[0]
         
-        parsed = processor.post_process_generation(generated_text, task=task, image_size=image.size)
-        
-        if isinstance(parsed, dict):
-            caption = parsed.get(task, generated_text)
-        else:
-            caption = str(parsed)
-        
-        caption = str(caption).strip()
-        
-        return caption
+        return _parse_florence_output(processor, generated_text, task, image)
         
     except Exception as e:
         print(f"❌ Error generating Florence caption: {e}")
@@ -98,6 +136,136 @@ def generate_florence_caption(image, task="<DETAILED_CAPTION>"):
         return None
 
 
+def _parse_florence_output(processor, generated_text, task, image):
+    parsed = processor.post_process_generation(generated_text, task=task, image_size=image.size)
+    
+    if isinstance(parsed, dict):
+        caption = parsed.get(task, generated_text)
+    else:
+        caption = str(parsed)
+    
+    return str(caption).strip()
+
+
+def encode_florence_image(image):
+    """Run the processor and the DaViT vision encoder once; the features can be decoded against any task"""
+    return _encode_florence_images([image])
+
+
+def _encode_florence_images(images):
+    processor, model = load_florence_model()
+    if model is None:
+        return None
+    
+    pixel_values = processor.image_processor(images, return_tensors="pt")["pixel_values"].to(DEVICE)
+    with torch.no_grad():
+        return model._encode_image(pixel_values)
+
+
+def _decode_florence(images, rows, profile=None, image_features=None):
+    """
+    Decode (image index, task) rows in one generate call.
+    
+    Every image is encoded once; each row pairs its image's features with
+    the task prompt, padded to the longest prompt. Image features are
+    merged with the prompt embeddings the same way Florence-2's own
+    generate() does. Returns one caption per row.
+    """
+    processor, model = load_florence_model()
+    if model is None:
+        return [None for _ in rows]
+    
+    if image_features is None:
+        image_features = _encode_florence_images(images)
+    
+    prompts = processor._construct_prompts([task for _, task in rows])
+    text_inputs = processor.tokenizer(prompts, padding=True, return_tensors="pt")
+    input_ids = text_inputs["input_ids"].to(DEVICE)
+    text_mask = text_inputs["attention_mask"].to(DEVICE)
+    
+    with torch.no_grad():
+        index = torch.tensor([image_index for image_index, _ in rows], device=image_features.device)
+        features = image_features.index_select(0, index)
+        text_embeds = model.get_input_embeddings()(input_ids)
+        inputs_embeds = torch.cat([features, text_embeds], dim=1)
+        image_mask = torch.ones(features.shape[:2], dtype=text_mask.dtype, device=DEVICE)
+        attention_mask = torch.cat([image_mask, text_mask], dim=1)
+    
+    generated_ids = _florence_generate(
+        model.language_model.generate, profile,
+        input_ids=None,
+        inputs_embeds=inputs_embeds,
+        attention_mask=attention_mask
+    )
+    
+    generated_texts = processor.batch_decode(generated_ids, skip_special_tokens=False)
+    return [
+        _parse_florence_output(processor, text, task, images[image_index])
+        for (image_index, task), text in zip(rows, generated_texts)
+    ]
+
+
+def _caption_items(items):
+    """Batcher callback: items are (image, tasks, profile); one generate call per profile"""
+    results = [None] * len(items)
+    by_profile = {}
+    for position, (_, _, profile) in enumerate(items):
+        by_profile.setdefault(profile, []).append(position)
+    
+    for profile, positions in by_profile.items():
+        images = [items[position][0] for position in positions]
+        rows = [(image_index, task) for image_index, position in enumerate(positions) for task in items[position][1]]
+        try:
+            captions = iter(_decode_florence(images, rows, profile))
+            for position in positions:
+                results[position] = {task: next(captions) for task in items[position][1]}
+        except Exception as e:
+            print(f"⚠️ Batched Florence-2 decoding failed ({e}), running tasks one at a time")
+            for position in positions:
+                image, tasks, _ = items[position]
+                results[position] = {task: _generate_florence_single(image, task, profile) for task in tasks}
+    
+    return results
+
+
+def get_florence_batcher():
+    return get_batcher(
+        "florence-2",
+        _caption_items,
+        max_batch=FLORENCE_BATCH_MAX_IMAGES,
+        max_wait_ms=FLORENCE_BATCH_WAIT_MS
+    )
+
+
+def generate_florence_captions(image, tasks=("<CAPTION>", "<DETAILED_CAPTION>", "<OCR>"), image_features=None, profile=None):
+    """
+    Run several Florence-2 tasks on one image with a single encoder pass.
+    
+    The image is encoded once (or image_features from encode_florence_image
+    are reused), then all task prompts are decoded together in one batched
+    generate call. With FLORENCE_BATCHING on, concurrent callers share that
+    call: requests arriving within FLORENCE_BATCH_WAIT_MS of each other, up
+    to FLORENCE_BATCH_MAX_IMAGES images, are decoded as one padded batch.
+    Returns {task: caption}; tasks fall back to one generate call each if
+    the batched call fails.
+    """
+    processor, model = load_florence_model()
+    if model is None:
+        return {task: None for task in tasks}
+    
+    tasks = tuple(tasks)
+    profile, _ = get_decoding_profile(profile)
+    if FLORENCE_BATCHING and image_features is None:
+        return get_florence_batcher().submit((image, tasks, profile)).result()
+    
+    try:
+        captions = _decode_florence([image], [(0, task) for task in tasks], profile, image_features)
+        return dict(zip(tasks, captions))
+    except Exception as e:
+        print(f"⚠️ Batched Florence-2 decoding failed ({e}), running tasks one at a time")
+        return {task: _generate_florence_single(image, task, profile) for task in tasks}
+
+
 def get_groq_description(caption, image_base64=None):
     if not GROQ_API_KEY:
         print("⚠️ GROQ_API_KEY not set, skipping detailed description")
@@ -150,8 +318,14 @@ Provide ONLY the description, no preamble or explanation."""
         return None
 
 
-def generate_alt_text(image_file, max_length=75, num_captions=1):
-    temp_path = None
+@request_memoized("alttext", file_input=True)
+@cached_stage(
+    "alttext",
+    model_id=lambda: _alt_text_model_id(),
+    file_input=True,
+    cacheable=lambda result: result.get("model") != "fallback"
+)
+def generate_alt_text(image_file, max_length=75, num_captions=1, profile=None):
     pil_image = None
     width, height = None, None
     
@@ -160,114 +334,43 @@ def generate_alt_text(image_file, max_length=75, num_captions=1):
         
         print("🔍 Loading image for captioning...")
         
-        if hasattr(image_file, 'save'):
-            original_filename = getattr(image_file, 'filename', 'image.png')
-            ext = os.path.splitext(original_filename)[1] or '.png'
-            temp_path = tempfile.mktemp(suffix=ext)
-            
-            image_file.save(temp_path)
-            image_file.seek(0)
-            
-            pil_image = Image.open(temp_path)
-            print(f"✅ Image loaded from Flask upload: {original_filename}")
-            
-        elif hasattr(image_file, 'read'):
-            pil_image = Image.open(image_file)
-            print("✅ Image loaded from file-like object")
-            
-        elif isinstance(image_file, str):
-            if os.path.exists(image_file):
-                pil_image = Image.open(image_file)
-                print(f"✅ Image loaded from path: {image_file}")
-            else:
-                print(f"❌ Image file not found: {image_file}")
-                return {
-                    "success": False,
-                    "error": "Image file not found",
-                    "alt_text": "Image"
-                }
-        else:
-            pil_image = Image.open(image_file)
-            print("✅ Image loaded directly")
+        if isinstance(image_file, str) and not os.path.exists(image_file):
+            print(f"❌ Image file not found: {image_file}")
+            return {
+                "success": False,
+                "error": "Image file not found",
+                "alt_text": "Image"
+            }
         
-        if pil_image.mode != 'RGB':
-            print(f"🔄 Converting from {pil_image.mode} to RGB...")
-            pil_image = pil_image.convert('RGB')
+        upload = as_upload(image_file)
+        prepared = prepare_image(upload)
+        pil_image = prepared.view("florence")
+        print(f"✅ Image loaded: {upload.filename or 'upload'}")
         
-        width, height = pil_image.size
-        print(f"📐 Image size: {width}x{height}")
+        width, height = prepared.original_size
+        print(f"📐 Image size: {width}x{height} (captioned at {pil_image.width}x{pil_image.height})")
         
         print("🖼️ Generating caption with Florence-2...")
         
-        brief_caption = None
-        detailed_caption = None
-        ocr_result = None
+        profile, _ = get_decoding_profile(profile)
+        image_hash, stored = _find_similar_alt_text(pil_image, profile, (width, height))
+        if stored is not None:
+            return stored
         
-        try:
-            brief_caption = generate_florence_caption(pil_image, "<CAPTION>")
-            print(f"📝 Brief caption: {brief_caption}")
-        except Exception as e:
-            print(f"⚠️ Brief caption failed: {e}")
+        captions = generate_florence_captions(pil_image, ALT_TEXT_TASKS, profile=profile)
+        _log_captions(captions)
         
-        try:
-            detailed_caption = generate_florence_caption(pil_image, "<DETAILED_CAPTION>")
-            print(f"📝 Detailed caption: {detailed_caption}")
-        except Exception as e:
-            print(f"⚠️ Detailed caption failed: {e}")
+        enhanced_description = None
+        main_caption = _main_caption(captions)
+        if main_caption and GROQ_API_KEY:
+            print("🤖 Getting Groq enhanced description...")
+            enhanced_description = get_groq_description(main_caption)
+            if enhanced_description:
+                print(f"✅ Groq description: {enhanced_description[:100]}...")
         
-        try:
-            ocr_result = generate_florence_caption(pil_image, "<OCR>")
-            if ocr_result:
-                print(f"📝 OCR result: {ocr_result[:100]}...")
-        except Exception as e:
-            print(f"⚠️ OCR failed: {e}")
-        
-        if brief_caption or detailed_caption:
-            main_caption = detailed_caption if detailed_caption else brief_caption
-            print(f"✅ Florence-2 caption: {main_caption}")
-            
-            enhanced_description = None
-            if GROQ_API_KEY:
-                print("🤖 Getting Groq enhanced description...")
-                enhanced_description = get_groq_description(main_caption)
-                if enhanced_description:
-                    print(f"✅ Groq description: {enhanced_description[:100]}...")
-            
-            alt_text = _format_for_accessibility(brief_caption if brief_caption else detailed_caption)
-            
-            if temp_path and os.path.exists(temp_path):
-                try:
-                    os.remove(temp_path)
-                except:
-                    pass
-            
-            result = {
-                "success": True,
-                "alt_text": alt_text,
-                "raw_caption": brief_caption,
-                "detailed_caption": detailed_caption,
-                "enhanced_description": enhanced_description,
-                "ocr_text": ocr_result if ocr_result else None,
-                "all_captions": [c for c in [brief_caption, detailed_caption] if c],
-                "image_info": {
-                    "width": width,
-                    "height": height,
-                    "aspect_ratio": round(width/height, 2) if height > 0 else 1
-                },
-                "model": "Florence-2-base + Groq Llama-3.1-8B" if enhanced_description else "Florence-2-base",
-                "confidence": 0.95
-            }
-            
-            print(f"✅ Returning alt text result with {len(result)} fields")
-            return result
-        
-        print("⚠️ Florence-2 returned no captions, using fallback...")
-        if temp_path and os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except:
-                pass
-        return _basic_fallback(width, height)
+        result = _build_alt_text_result(captions, enhanced_description, width, height, profile)
+        _remember_alt_text(image_hash, profile, result)
+        return result
         
     except ImportError as e:
         print(f"❌ Import error: {e}")
@@ -281,12 +384,6 @@ def generate_alt_text(image_file, max_length=75, num_captions=1):
         import traceback
         traceback.print_exc()
         
-        if temp_path and os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except:
-                pass
-        
         return {
             "success": False,
             "error": str(e),
@@ -294,6 +391,206 @@ def generate_alt_text(image_file, max_length=75, num_captions=1):
         }
 
 
+def _alt_text_model_id(profile=None):
+    return (f"florence-2-base{registry.precision_tag('florence-2')}:{profile or FLORENCE_PROFILE}"
+            + ("+llama-3.1-8b-instant" if GROQ_API_KEY else ""))
+
+
+def _find_similar_alt_text(image, profile, original_size):
+    """
+    Look the image up in the perceptual hash index.
+    
+    Returns (image_hash, result): result is the alt text stored for a
+    near-duplicate image (re-encoded, resized) or None. image_hash is None
+    when the index is disabled.
+    """
+    if not PHASH_ENABLED:
+        return None, None
+    try:
+        image_hash = phash(image)
+        result, distance = get_perceptual_index().lookup(image_hash, _alt_text_model_id(profile))
+    except Exception as e:
+        print(f"⚠️ Perceptual hash lookup failed: {e}")
+        return None, None
+    
+    if result is not None:
+        width, height = original_size
+        print(f"⚡ Near-duplicate image (distance {distance}), reusing stored alt text")
+        result["image_info"] = _image_info(width, height)
+        result["phash_match"] = {"distance": distance}
+    return image_hash, result
+
+
+def _remember_alt_text(image_hash, profile, result):
+    if image_hash is None or not result.get("success") or result.get("model") == "fallback":
+        return
+    try:
+        get_perceptual_index().add(image_hash, _alt_text_model_id(profile), result)
+    except Exception as e:
+        print(f"⚠️ Could not store perceptual hash: {e}")
+
+
+def _image_info(width, height):
+    return {
+        "width": width,
+        "height": height,
+        "aspect_ratio": round(width/height, 2) if height > 0 else 1
+    }
+
+
+def _log_captions(captions):
+    print(f"📝 Brief caption: {captions.get('<CAPTION>')}")
+    print(f"📝 Detailed caption: {captions.get('<DETAILED_CAPTION>')}")
+    if captions.get("<OCR>"):
+        print(f"📝 OCR result: {captions['<OCR>'][:100]}...")
+
+
+def _main_caption(captions):
+    return captions.get("<DETAILED_CAPTION>") or captions.get("<CAPTION>")
+
+
+def _build_alt_text_result(captions, enhanced_description, width, height, profile):
+    brief_caption = captions.get("<CAPTION>")
+    detailed_caption = captions.get("<DETAILED_CAPTION>")
+    ocr_result = captions.get("<OCR>")
+    
+    if not (brief_caption or detailed_caption):
+        print("⚠️ Florence-2 returned no captions, using fallback...")
+        return _basic_fallback(width, height)
+    
+    print(f"✅ Florence-2 caption: {_main_caption(captions)}")
+    
+    return {
+        "success": True,
+        "alt_text": _format_for_accessibility(brief_caption if brief_caption else detailed_caption),
+        "raw_caption": brief_caption,
+        "detailed_caption": detailed_caption,
+        "enhanced_description": enhanced_description,
+        "ocr_text": ocr_result if ocr_result else None,
+        "all_captions": [c for c in [brief_caption, detailed_caption] if c],
+        "image_info": _image_info(width, height),
+        "model": "Florence-2-base + Groq Llama-3.1-8B" if enhanced_description else "Florence-2-base",
+        "profile": profile,
+        "confidence": 0.95
+    }
+
+
+def generate_alt_text_batch(image_files, profile=None):
+    """
+    Alt text for many images at once, returned in input order.
+    
+    Images are decoded on ALT_TEXT_BATCH_WORKERS threads, identical images
+    are captioned once, Florence-2 runs in batches of up to
+    FLORENCE_BATCH_MAX_IMAGES, and each Groq description is requested as
+    soon as its image's captions are ready, at most GROQ_CONCURRENCY at a
+    time. Every result carries its filename and a per-image timing.
+    """
+    profile, _ = get_decoding_profile(profile)
+    uploads = [as_upload(image_file) for image_file in image_files]
+    count = len(uploads)
+    images = [None] * count
+    sizes = [None] * count
+    errors = [None] * count
+    timings = [{} for _ in uploads]
+    
+    def preprocess(index):
+        started = time.perf_counter()
+        try:
+            prepared = prepare_image(uploads[index])
+            images[index] = prepared.view("florence")
+            sizes[index] = prepared.original_size
+        except Exception as e:
+            errors[index] = f"Could not read {uploads[index].filename or 'image'}: {type(e).__name__}"
+        timings[index]["preprocess_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    
+    with ThreadPoolExecutor(max_workers=ALT_TEXT_BATCH_WORKERS) as pool:
+        list(pool.map(preprocess, range(count)))
+    
+    # slide decks repeat logos and backgrounds; caption each distinct image once
+    source_of = {}
+    first_by_digest = {}
+    for index, upload in enumerate(uploads):
+        if images[index] is not None:
+            source_of[index] = first_by_digest.setdefault(upload.digest(), index)
+    unique = []
+    stored = {}
+    image_hashes = {}
+    for index in sorted(set(source_of.values())):
+        image_hashes[index], stored_result = _find_similar_alt_text(images[index], profile, sizes[index])
+        if stored_result is not None:
+            stored[index] = stored_result
+        else:
+            unique.append(index)
+    print(f"🖼️ Captioning {len(unique)} new image(s) of {count} with Florence-2 ({profile})")
+    
+    captions = {}
+    enhanced = {}
+    groq_pool = ThreadPoolExecutor(max_workers=GROQ_CONCURRENCY) if GROQ_API_KEY else None
+    groq_futures = {}
+    caption_started = time.perf_counter()
+    
+    def caption_ready(index, result):
+        captions[index] = result
+        timings[index]["caption_ms"] = round((time.perf_counter() - caption_started) * 1000, 1)
+        main_caption = _main_caption(result)
+        if groq_pool and main_caption:
+            groq_futures[index] = groq_pool.submit(_timed, get_groq_description, main_caption)
+    
+    try:
+        if FLORENCE_BATCHING:
+            futures = {
+                get_florence_batcher().submit((images[index], ALT_TEXT_TASKS, profile)): index
+                for index in unique
+            }
+            for future in as_completed(futures):
+                caption_ready(futures[future], future.result())
+        else:
+            for start in range(0, len(unique), FLORENCE_BATCH_MAX_IMAGES):
+                chunk = unique[start:start + FLORENCE_BATCH_MAX_IMAGES]
+                results = _caption_items([(images[index], ALT_TEXT_TASKS, profile) for index in chunk])
+                for index, result in zip(chunk, results):
+                    caption_ready(index, result)
+        
+        for index, future in groq_futures.items():
+            enhanced[index], timings[index]["groq_ms"] = future.result()
+    finally:
+        if groq_pool:
+            groq_pool.shutdown(wait=False)
+    
+    for index in unique:
+        width, height = sizes[index]
+        stored[index] = _build_alt_text_result(captions[index], enhanced.get(index), width, height, profile)
+        _remember_alt_text(image_hashes[index], profile, stored[index])
+    
+    results = []
+    for index, upload in enumerate(uploads):
+        if errors[index]:
+            result = {"success": False, "error": errors[index], "alt_text": "Image"}
+        else:
+            source = source_of[index]
+            result = copy.deepcopy(stored[source])
+            if source != index:
+                width, height = sizes[index]
+                result["image_info"] = _image_info(width, height)
+                result["duplicate_of"] = source
+        
+        timing = dict(timings[index])
+        if errors[index] is None and source_of[index] != index:
+            timing.update({k: v for k, v in timings[source_of[index]].items() if k != "preprocess_ms"})
+        result["index"] = index
+        result["filename"] = upload.filename
+        result["timing"] = timing
+        results.append(result)
+    
+    return results
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    value = func(*args)
+    return value, round((time.perf_counter() - started) * 1000, 1)
+
+
 def _basic_fallback(width=None, height=None):
     """Basic fallback when no ML model works"""
     return {
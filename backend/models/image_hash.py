@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import threading
+
+from .cache import CACHE_ENABLED, CACHE_DIR
+
+PHASH_ENABLED = CACHE_ENABLED and os.getenv("PHASH_ENABLED", "1") == "1"
+# bits out of 64 that may differ for two images to count as the same picture
+PHASH_MAX_DISTANCE = int(os.getenv("PHASH_MAX_DISTANCE", "6"))
+PHASH_MAX_ENTRIES = int(os.getenv("PHASH_MAX_ENTRIES", "20000"))
+PHASH_INDEX_PATH = os.getenv("PHASH_INDEX_PATH", os.path.join(CACHE_DIR, "phash_index.jsonl"))
+
+_DCT_SIZE = 32
+_HASH_SIZE = 8
+_dct_matrix = None
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _get_dct_matrix():
+    global _dct_matrix
+    if _dct_matrix is None:
+        import numpy as np
+
+        n = np.arange(_DCT_SIZE)
+        matrix = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * _DCT_SIZE))
+        matrix[0] *= 1 / np.sqrt(2)
+        _dct_matrix = matrix * np.sqrt(2 / _DCT_SIZE)
+    return _dct_matrix
+
+
+def phash(image):
+    """
+    64-bit perceptual hash of a PIL image.
+
+    The image is reduced to 32x32 grayscale and transformed with a 2-D DCT.
+    Each bit records whether one of the 8x8 lowest frequencies is above
+    their median, so re-encoding, rescaling and small edits flip few bits.
+    """
+    import numpy as np
+    from PIL import Image
+
+    gray = image.convert("L").resize((_DCT_SIZE, _DCT_SIZE), Image.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.float64)
+    dct = _get_dct_matrix()
+    low = (dct @ pixels @ dct.T)[:_HASH_SIZE, :_HASH_SIZE].ravel()
+    bits = low > np.median(low[1:])
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def _hamming(hashes, value):
+    import numpy as np
+
+    xor = hashes ^ np.uint64(value)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor)
+    return np.unpackbits(xor.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+
+
+class PerceptualIndex:
+    """
+    Results for previously seen images, found by perceptual hash.
+
+    Hashes are kept in one NumPy array per model id, so a lookup is a
+    single vectorized XOR/popcount over every stored image; adds append
+    to that array. Beyond max_entries the oldest entries are dropped in
+    memory. Entries are appended to a JSON-lines file and reloaded on
+    start; the file is rewritten without the dropped entries once it
+    grows to twice max_entries.
+    """
+
+    def __init__(self, path=PHASH_INDEX_PATH, max_distance=PHASH_MAX_DISTANCE, max_entries=PHASH_MAX_ENTRIES):
+        self.path = path
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._entries = []
+        # model id -> (hashes, positions); positions count every entry ever
+        # held, so self._entries[position - self._dropped] is the entry
+        self._arrays = {}
+        self._dropped = 0
+        self._lines = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "stores": 0}
+
+    def _load(self):
+        self._loaded = True
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self._entries.append(json.loads(line))
+                        self._lines += 1
+        except Exception as e:
+            print(f"⚠️ Could not load perceptual hash index: {e}")
+        self._entries = self._entries[-self.max_entries:]
+        self._arrays.clear()
+        self._dropped = 0
+
+    def _hashes(self, model_id):
+        import numpy as np
+
+        if model_id not in self._arrays:
+            indexes = [i for i, entry in enumerate(self._entries) if entry["model_id"] == model_id]
+            hashes = np.array([int(self._entries[i]["hash"], 16) for i in indexes], dtype=np.uint64)
+            positions = np.array(indexes, dtype=np.int64) + self._dropped
+            self._arrays[model_id] = (hashes, positions)
+        return self._arrays[model_id]
+
+    def _trim(self):
+        """Drop the oldest entries beyond max_entries, and their hashes"""
+        import numpy as np
+
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+        del self._entries[:excess]
+        self._dropped += excess
+        for model_id, (hashes, positions) in self._arrays.items():
+            cut = int(np.searchsorted(positions, self._dropped))
+            if cut:
+                self._arrays[model_id] = (hashes[cut:], positions[cut:])
+
+    def lookup(self, image_hash, model_id):
+        """Return (result, distance) for the closest stored image within max_distance, else (None, None)"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._stats["lookups"] += 1
+            hashes, positions = self._hashes(model_id)
+            if not len(hashes):
+                return None, None
+
+            distances = _hamming(hashes, image_hash)
+            best = int(distances.argmin())
+            distance = int(distances[best])
+            if distance > self.max_distance:
+                return None, None
+
+            self._stats["hits"] += 1
+            return json.loads(json.dumps(self._entries[int(positions[best]) - self._dropped]["result"])), distance
+
+    def add(self, image_hash, model_id, result):
+        import numpy as np
+
+        entry = {"hash": f"{image_hash:016x}", "model_id": model_id, "created": time.time(), "result": result}
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            if model_id in self._arrays:
+                hashes, positions = self._arrays[model_id]
+                self._arrays[model_id] = (
+                    np.append(hashes, np.array([image_hash], dtype=np.uint64)),
+                    np.append(positions, np.array([self._dropped + len(self._entries)], dtype=np.int64)),
+                )
+            self._entries.append(entry)
+            self._stats["stores"] += 1
+            self._trim()
+
+            if not self.path:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                if self._lines >= 2 * self.max_entries:
+                    tmp_path = f"{self.path}.tmp"
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        for kept in self._entries:
+                            f.write(json.dumps(kept, default=str) + "\n")
+                    os.replace(tmp_path, self.path)
+                    self._lines = len(self._entries)
+                else:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry, default=str) + "\n")
+                    self._lines += 1
+            except Exception as e:
+                print(f"⚠️ Could not write perceptual hash index: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "max_distance": self.max_distance,
+                "path": self.path,
+            }
+
+
+def get_perceptual_index(name="alttext"):
+    """Process-wide index for one kind of result; "alttext" uses PHASH_INDEX_PATH"""
+    with _indexes_lock:
+        if name not in _indexes:
+            path = PHASH_INDEX_PATH if name == "alttext" else os.path.join(CACHE_DIR, f"phash_{name}.jsonl")
+            _indexes[name] = PerceptualIndex(path)
+        return _indexes[name]
+
+
+def get_perceptual_index_stats():
+    with _indexes_lock:
+        indexes = dict(_indexes)
+    return {"enabled": PHASH_ENABLED, "indexes": {name: index.stats() for name, index in indexes.items()}}
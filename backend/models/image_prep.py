@@ -0,0 +1,88 @@
+import os
+import threading
+
+from .uploads import as_upload
+
+# longest side each consumer needs: Florence-2 resizes to 768x768 itself,
+# line OCR needs enough resolution left for small print after segmentation
+MODEL_INPUT_SIDES = {
+    "florence": int(os.getenv("FLORENCE_MAX_SIDE", "768")),
+    "ocr": int(os.getenv("OCR_MAX_SIDE", "2000")),
+}
+
+_prepared_lock = threading.Lock()
+
+# EXIF orientations that rotate the image by 90 or 270 degrees
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+class PreparedImage:
+    """
+    One decoded, RGB, EXIF-free copy of an uploaded image, shared by every model that reads it.
+
+    The image is decoded at the smallest resolution the requested model
+    needs (JPEGs through Image.draft, which lets libjpeg scale down while
+    decoding), rotated upright and converted to RGB once. view(model)
+    returns it capped at MODEL_INPUT_SIDES[model]; a later request for a
+    larger side decodes again at that size, smaller sides are derived from
+    the existing copy.
+    """
+
+    def __init__(self, upload):
+        self.upload = upload
+        self.original_size = None
+        self._base = None
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def view(self, model):
+        side = MODEL_INPUT_SIDES[model]
+        with self._lock:
+            if self._base is None or self._needs_larger_base(side):
+                self._decode(side)
+            if side not in self._views:
+                image = self._base
+                if max(image.size) > side:
+                    image = image.copy()
+                    image.thumbnail((side, side))
+                self._views[side] = image
+            return self._views[side]
+
+    def _needs_larger_base(self, side):
+        return max(self._base.size) < min(side, max(self.original_size))
+
+    def _decode(self, side):
+        from PIL import Image, ImageOps
+
+        image = Image.open(self.upload.open())
+        width, height = image.size
+        orientation = image.getexif().get(0x0112)
+        if orientation in _TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        self.original_size = (width, height)
+
+        if image.format == "JPEG" and max(image.size) > side:
+            scale = side / max(image.size)
+            image.draft("RGB", (int(image.size[0] * scale), int(image.size[1] * scale)))
+
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        else:
+            image.load()
+        if max(image.size) > side:
+            image.thumbnail((side, side))
+        image.info = {}
+
+        self._base = image
+        self._views = {}
+
+
+def prepare_image(source):
+    """The PreparedImage for an upload, file or path; Uploads keep theirs so stages share it"""
+    upload = as_upload(source)
+    with _prepared_lock:
+        prepared = upload.derived.get("prepared_image")
+        if prepared is None:
+            prepared = upload.derived["prepared_image"] = PreparedImage(upload)
+    return prepared
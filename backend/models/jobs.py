@@ -0,0 +1,355 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.db")
+JOB_UPLOAD_DIR = os.getenv("JOB_UPLOAD_DIR", os.path.join("uploads", "jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# completed and failed jobs are deleted this long after they finish; 0 keeps them forever
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "168"))
+JOB_PURGE_INTERVAL = 3600
+
+# pid plus a nonce, so a restarted container that reuses the same pid
+# doesn't mistake the previous worker's jobs for its own
+WORKER_ID = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_db_lock = threading.Lock()
+_executor = None
+_schema_ready = False
+_last_purge = 0.0
+
+
+def _connect():
+    global _schema_ready
+    conn = sqlite3.connect(JOBS_DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if not _schema_ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                params TEXT NOT NULL,
+                stages TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                worker TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+        _schema_ready = True
+    return conn
+
+
+def _update_job(job_id, **fields):
+    fields["updated_at"] = time.time()
+    for key in ("params", "stages", "result"):
+        if key in fields:
+            fields[key] = json.dumps(fields[key])
+    assignments = ", ".join(f"{key} = ?" for key in fields)
+    with _db_lock:
+        conn = _connect()
+        try:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def _row_to_job(row):
+    return {
+        "job_id": row["id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "stages": json.loads(row["stages"]),
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+def get_job(job_id):
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _row_to_job(row) if row else None
+
+
+def _claim_job(job_id):
+    """Atomically move a queued job to running so only one worker picks it up"""
+    with _db_lock:
+        conn = _connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (WORKER_ID, time.time(), job_id)
+            )
+            conn.commit()
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+
+def _save_upload(job_dir, field, file_obj):
+    filename = os.path.basename(file_obj.filename or field)
+    path = os.path.join(job_dir, f"{field}_{filename}")
+    file_obj.save(path)
+    return path
+
+
+def get_job_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+    return _executor
+
+
+def submit_job(kind, params=None, files=None):
+    """
+    Persist a job and its uploads, queue it and return the job id.
+
+    Uploads are copied under JOB_UPLOAD_DIR so the job can still run after
+    the request that created it has finished, or after a restart.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    job_id = uuid.uuid4().hex
+    params = dict(params or {})
+    job_dir = os.path.join(JOB_UPLOAD_DIR, job_id)
+
+    file_paths = {}
+    for field, file_obj in (files or {}).items():
+        if file_obj is not None and file_obj.filename:
+            os.makedirs(job_dir, exist_ok=True)
+            file_paths[field] = _save_upload(job_dir, field, file_obj)
+    params["files"] = file_paths
+
+    now = time.time()
+    with _db_lock:
+        conn = _connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, stages, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, '{}', ?, ?)",
+                (job_id, kind, json.dumps(params), now, now)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    get_job_executor().submit(_run_job, job_id)
+    print(f"📥 Queued {kind} job {job_id}")
+    _purge_periodically()
+    return job_id
+
+
+def _run_job(job_id):
+    if not _claim_job(job_id):
+        return
+
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT kind, params FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+
+    kind = row["kind"]
+    params = json.loads(row["params"])
+    started = time.time()
+    print(f"⚙️ Running {kind} job {job_id}")
+
+    try:
+        result = JOB_HANDLERS[kind](job_id, params)
+        _update_job(job_id, status="completed", result=result)
+        print(f"✅ Job {job_id} completed in {time.time() - started:.1f}s")
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        _update_job(job_id, status="failed", error=str(e))
+        print(f"❌ Job {job_id} failed: {e}")
+    finally:
+        job_dir = os.path.join(JOB_UPLOAD_DIR, job_id)
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+
+def _run_process_job(job_id, params):
+    from .pipeline import build_process_stages, iter_stages
+
+    files = params.get("files", {})
+    stages = build_process_stages(
+        params.get("text", ""),
+        image_file=files.get("image"),
+        audio_file=files.get("audio"),
+        pdf_file=files.get("pdf"),
+    )
+
+    stage_status = {name: {"status": "pending"} for name in stages}
+    results = {}
+    _update_job(job_id, stages=stage_status)
+
+    def on_start(name):
+        stage_status[name] = {"status": "running"}
+        _update_job(job_id, stages=stage_status)
+
+    for name, result, elapsed in iter_stages(stages, on_start=on_start):
+        failed = isinstance(result, dict) and result.get("success") is False and "error" in result
+        stage_status[name] = {
+            "status": "failed" if failed else "completed",
+            "elapsed": round(elapsed, 3)
+        }
+        results[name] = result
+        _update_job(job_id, stages=stage_status, result={"results": results})
+
+    return {"results": {name: results[name] for name in stages if name in results}}
+
+
+def _run_single_stage(job_id, name, func):
+    _update_job(job_id, stages={name: {"status": "running"}})
+    started = time.time()
+    result = func()
+    _update_job(job_id, stages={name: {
+        "status": "completed" if result.get("success") else "failed",
+        "elapsed": round(time.time() - started, 3)
+    }})
+    return result
+
+
+def _run_video_job(job_id, params):
+    from .video_processing import process_video_for_accessibility
+
+    video_path = params["files"]["video"]
+    result = _run_single_stage(job_id, "video", lambda: process_video_for_accessibility(video_path))
+    return {"result": result}
+
+
+def _run_video_captions_job(job_id, params):
+    from .video_processing import transcribe_video
+
+    video_path = params["files"]["video"]
+    result = _run_single_stage(job_id, "captions", lambda: transcribe_video(video_path))
+
+    if result.get("success"):
+        return {
+            "captions": result.get("captions", []),
+            "vtt_content": result.get("vtt_content", ""),
+            "speaker_segments": result.get("speaker_segments", []),
+            "duration": result.get("duration", 0)
+        }
+    return result
+
+
+JOB_HANDLERS = {
+    "process": _run_process_job,
+    "video": _run_video_job,
+    "video_captions": _run_video_captions_job,
+}
+
+
+def _worker_alive(worker):
+    if not worker:
+        return False
+    if worker == WORKER_ID:
+        return True
+    pid = int(worker.split(":")[0])
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def purge_finished_jobs(max_age=None):
+    """
+    Delete completed and failed jobs that finished more than max_age seconds ago.
+
+    max_age defaults to JOB_RETENTION_HOURS. Any saved inputs still under
+    JOB_UPLOAD_DIR for those jobs are removed with them. Returns the
+    number of jobs deleted.
+    """
+    if max_age is None:
+        max_age = JOB_RETENTION_HOURS * 3600
+    if max_age <= 0:
+        return 0
+
+    with _db_lock:
+        conn = _connect()
+        try:
+            job_ids = [row["id"] for row in conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('completed', 'failed') AND updated_at < ?",
+                (time.time() - max_age,)
+            ).fetchall()]
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+            conn.commit()
+        finally:
+            conn.close()
+
+    for job_id in job_ids:
+        shutil.rmtree(os.path.join(JOB_UPLOAD_DIR, job_id), ignore_errors=True)
+    if job_ids:
+        print(f"🧹 Purged {len(job_ids)} finished job(s)")
+    return len(job_ids)
+
+
+def _purge_periodically():
+    """Run purge_finished_jobs at most once per JOB_PURGE_INTERVAL seconds"""
+    global _last_purge
+    now = time.time()
+    if now - _last_purge < JOB_PURGE_INTERVAL:
+        return
+    _last_purge = now
+    try:
+        purge_finished_jobs()
+    except Exception as e:
+        print(f"⚠️ Could not purge finished jobs: {e}")
+
+
+def resume_pending_jobs():
+    """
+    Re-queue jobs left behind by a previous worker.
+
+    Queued jobs are picked up directly; running jobs are reset to queued
+    when the process that owned them is gone.
+    """
+    with _db_lock:
+        conn = _connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, status, worker FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+            to_resume = []
+            for row in rows:
+                if row["status"] == "running":
+                    if _worker_alive(row["worker"]):
+                        continue
+                    conn.execute(
+                        "UPDATE jobs SET status = 'queued', updated_at = ? WHERE id = ?",
+                        (time.time(), row["id"])
+                    )
+                to_resume.append(row["id"])
+            conn.commit()
+        finally:
+            conn.close()
+
+    for job_id in to_resume:
+        get_job_executor().submit(_run_job, job_id)
+
+    if to_resume:
+        print(f"🔁 Resumed {len(to_resume)} pending job(s)")
+    return len(to_resume)
@@ -0,0 +1,190 @@
+import os
+import json
+import queue
+from contextlib import contextmanager
+
+from .cache import CACHE_DIR
+
+# Optional onnxruntime
+try:
+    import onnxruntime
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+# "transformers" keeps the plain pipelines, "onnx" exports and runs them with onnxruntime
+BIAS_BACKEND = os.getenv("BIAS_BACKEND", "transformers").lower()
+ONNX_BACKEND_ENABLED = BIAS_BACKEND == "onnx" and ONNX_AVAILABLE
+if BIAS_BACKEND == "onnx" and not ONNX_AVAILABLE:
+    print("⚠️ BIAS_BACKEND=onnx but onnxruntime is not installed - using transformers pipelines")
+
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", os.path.join(CACHE_DIR, "onnx"))
+ONNX_SESSION_POOL_SIZE = int(os.getenv("ONNX_SESSION_POOL_SIZE", "2"))
+# 0 lets onnxruntime pick
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+ONNX_BATCH_SIZE = int(os.getenv("ONNX_BATCH_SIZE", "16"))
+ONNX_OPSET = 14
+
+
+def _artifact_dir(model_name):
+    return os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "__"))
+
+
+def export_classifier(model_name, int8=False):
+    """
+    Export a Hugging Face sequence classifier to ONNX once and return its directory.
+
+    The directory holds model.onnx (and model.int8.onnx when int8 is
+    requested, quantized with onnxruntime), the tokenizer and labels.json
+    with the label map and problem type. Later calls reuse the files.
+    """
+    directory = _artifact_dir(model_name)
+    model_path = os.path.join(directory, "model.onnx")
+    labels_path = os.path.join(directory, "labels.json")
+
+    if not (os.path.exists(model_path) and os.path.exists(labels_path)):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        print(f"📤 Exporting {model_name} to ONNX...")
+        os.makedirs(directory, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+        sample = tokenizer(["export sample"], return_tensors="pt")
+
+        tmp_path = f"{model_path}.tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (sample["input_ids"], sample["attention_mask"]),
+                tmp_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "logits": {0: "batch"},
+                },
+                opset_version=ONNX_OPSET,
+            )
+        tokenizer.save_pretrained(directory)
+        with open(labels_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "id2label": {str(k): v for k, v in model.config.id2label.items()},
+                "problem_type": model.config.problem_type,
+                "max_length": min(tokenizer.model_max_length, model.config.max_position_embeddings - 2),
+            }, f)
+        os.replace(tmp_path, model_path)
+        print(f"✅ Exported {model_name} to {directory}")
+
+    if int8:
+        int8_path = os.path.join(directory, "model.int8.onnx")
+        if not os.path.exists(int8_path):
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+
+            quantize_dynamic(model_path, f"{int8_path}.tmp", weight_type=QuantType.QInt8)
+            os.replace(f"{int8_path}.tmp", int8_path)
+
+    return directory
+
+
+class _SessionPool:
+    """A fixed set of InferenceSessions; each call borrows one so concurrent requests don't share a session"""
+
+    def __init__(self, model_path, size):
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if ONNX_INTRA_OP_THREADS:
+            options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+
+        self._sessions = queue.Queue()
+        for _ in range(max(1, size)):
+            self._sessions.put(onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"]))
+
+    @contextmanager
+    def session(self):
+        session = self._sessions.get()
+        try:
+            yield session
+        finally:
+            self._sessions.put(session)
+
+
+class OnnxTextClassifier:
+    """
+    Drop-in replacement for a transformers "text-classification" pipeline, run by onnxruntime.
+
+    Called with a string it returns what the pipeline returns: the top
+    label as [{"label", "score"}], or every label sorted by score when
+    top_k=None. Called with a list it returns one such result per input
+    (for the default top_k a dict rather than a one-item list, as the
+    pipeline does). Scores use a sigmoid for multi-label models and a
+    softmax otherwise, like the pipeline's default function_to_apply.
+    """
+
+    _default = object()
+
+    def __init__(self, model_name, top_k=_default, int8=False, pool_size=ONNX_SESSION_POOL_SIZE):
+        from transformers import AutoTokenizer
+
+        directory = export_classifier(model_name, int8=int8)
+        with open(os.path.join(directory, "labels.json"), encoding="utf-8") as f:
+            labels = json.load(f)
+
+        self.model_name = model_name
+        self.top_k = top_k
+        self.int8 = int8
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        self.id2label = {int(k): v for k, v in labels["id2label"].items()}
+        self.multi_label = labels["problem_type"] == "multi_label_classification" or len(self.id2label) == 1
+        self.max_length = labels.get("max_length", 512)
+        model_file = "model.int8.onnx" if int8 else "model.onnx"
+        self._pool = _SessionPool(os.path.join(directory, model_file), pool_size)
+
+    def _scores(self, texts, batch_size):
+        import numpy as np
+
+        scores = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            encoded = self.tokenizer(batch, padding=True, truncation=True, max_length=self.max_length, return_tensors="np")
+            feeds = {
+                "input_ids": encoded["input_ids"].astype(np.int64),
+                "attention_mask": encoded["attention_mask"].astype(np.int64),
+            }
+            with self._pool.session() as session:
+                logits = session.run(["logits"], feeds)[0].astype(np.float64)
+
+            if self.multi_label:
+                probabilities = 1 / (1 + np.exp(-logits))
+            else:
+                shifted = np.exp(logits - logits.max(axis=-1, keepdims=True))
+                probabilities = shifted / shifted.sum(axis=-1, keepdims=True)
+            scores.extend(probabilities)
+        return scores
+
+    def _format(self, probabilities, top_k):
+        ranked = sorted(
+            ({"label": self.id2label[i], "score": float(p)} for i, p in enumerate(probabilities)),
+            key=lambda item: item["score"],
+            reverse=True
+        )
+        if top_k is None:
+            return ranked
+        return ranked[:top_k]
+
+    def __call__(self, inputs, top_k=_default, batch_size=None, **kwargs):
+        top_k = self.top_k if top_k is OnnxTextClassifier._default else top_k
+        legacy_top_1 = top_k is OnnxTextClassifier._default
+        if legacy_top_1:
+            top_k = 1
+
+        single = isinstance(inputs, str)
+        texts = [inputs] if single else list(inputs)
+        results = [self._format(p, top_k) for p in self._scores(texts, batch_size or ONNX_BATCH_SIZE)]
+
+        if single:
+            return results[0]
+        if legacy_top_1:
+            return [result[0] for result in results]
+        return results
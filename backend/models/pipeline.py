@@ -0,0 +1,271 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .text_extraction import extract_text_from_pdf, extract_text_from_image
+from .simplification import simplify_text
+from .translation import translate_text
+from .similarity import compute_similarity
+from .bias_detection import detect_bias
+from .wcag_checker import check_wcag_compliance
+from .sign_language import generate_gloss
+from .image_captioning import generate_alt_text
+from .speech_to_text import transcribe_audio
+from .uploads import as_upload
+from .cache import RequestMemo, current_request_memo, bind_request_memo
+
+PIPELINE_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", "6"))
+# pool workers one run may hold at once, counting its timed-out stages that are still running
+PIPELINE_RUN_MAX_STAGES = max(1, int(os.getenv("PIPELINE_RUN_MAX_STAGES", "3")))
+# how often a run re-checks stages that are queued behind other requests
+STAGE_POLL_SECONDS = 0.25
+
+# seconds, measured from the moment a stage starts running on a pool worker
+STAGE_TIMEOUTS = {
+    "extraction": 300,
+    "simplification": 90,
+    "translation": 120,
+    "similarity": 60,
+    "bias": 120,
+    "wcag": 30,
+    "signlanguage": 30,
+    "alttext": 180,
+    "transcript": 300,
+}
+
+_executor = None
+
+
+def get_executor():
+    """Process-wide bounded pool shared by every pipeline run"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=PIPELINE_MAX_WORKERS,
+            thread_name_prefix="pipeline"
+        )
+    return _executor
+
+
+def get_stage_timeout(name):
+    default = STAGE_TIMEOUTS.get(name, 120)
+    return float(os.getenv(f"STAGE_TIMEOUT_{name.upper()}", default))
+
+
+def _has_file(file_obj):
+    if file_obj is None:
+        return False
+    if isinstance(file_obj, str):
+        return bool(file_obj)
+    return bool(getattr(file_obj, "filename", None))
+
+
+def build_process_stages(text_content="", image_file=None, audio_file=None, pdf_file=None):
+    """
+    Build the /process dependency graph.
+
+    extraction -> simplification -> {translation, similarity, signlanguage}
+    extraction -> {bias, wcag, alttext, transcript}
+
+    Each stage receives the results of the stages that already finished and
+    falls back to the raw input text when one of its dependencies failed.
+    Uploads are wrapped once so every stage reads the same bytes; callers
+    passing Upload objects keep ownership of them.
+    """
+    has_pdf = _has_file(pdf_file)
+    has_image = _has_file(image_file)
+    has_audio = _has_file(audio_file)
+    pdf_file = as_upload(pdf_file) if has_pdf else None
+    image_file = as_upload(image_file) if has_image else None
+    audio_file = as_upload(audio_file) if has_audio else None
+
+    def extracted(ctx):
+        return ctx.get("extraction", {}).get("text", text_content)
+
+    def simplified(ctx):
+        text = extracted(ctx)
+        result = ctx.get("simplification")
+        if not result or "simplified" not in result:
+            return text
+        return result.get("simplified", text)
+
+    def extraction(ctx):
+        extracted_text = text_content
+
+        if has_pdf:
+            pdf_result = extract_text_from_pdf(pdf_file)
+            if pdf_result.get("success"):
+                extracted_text = pdf_result.get("text", "")
+
+        if has_image and not extracted_text:
+            ocr_result = extract_text_from_image(image_file)
+            if ocr_result.get("success"):
+                extracted_text = ocr_result.get("text", "")
+
+        if has_audio and not extracted_text:
+            audio_result = transcribe_audio(audio_file)
+            if audio_result.get("success"):
+                extracted_text = audio_result.get("transcript", "")
+
+        return {
+            "text": extracted_text,
+            "source": "pdf" if pdf_file else "image" if image_file else "audio" if audio_file else "direct"
+        }
+
+    def alttext(ctx):
+        return generate_alt_text(image_file)
+
+    def transcript(ctx):
+        return transcribe_audio(audio_file)
+
+    stages = {
+        "extraction": {"deps": [], "func": extraction},
+        "simplification": {"deps": ["extraction"], "func": lambda ctx: simplify_text(extracted(ctx))},
+        "translation": {"deps": ["simplification"], "func": lambda ctx: translate_text(simplified(ctx))},
+        "similarity": {"deps": ["simplification"], "func": lambda ctx: compute_similarity(extracted(ctx), simplified(ctx))},
+        "bias": {"deps": ["extraction"], "func": lambda ctx: detect_bias(extracted(ctx))},
+        "wcag": {"deps": ["extraction"], "func": lambda ctx: check_wcag_compliance(extracted(ctx))},
+        "signlanguage": {"deps": ["simplification"], "func": lambda ctx: generate_gloss(simplified(ctx))},
+    }
+
+    if has_image:
+        stages["alttext"] = {"deps": ["extraction"], "func": alttext}
+
+    if has_audio:
+        stages["transcript"] = {"deps": ["extraction"], "func": transcript}
+
+    for name, stage in stages.items():
+        stage.setdefault("timeout", get_stage_timeout(name))
+
+    return stages
+
+
+def _run_stage(state, context, func, ctx):
+    state["started"] = time.monotonic()
+    return context.run(func, ctx)
+
+
+def _timeout_result(timeout, reason="Stage timed out"):
+    return {"success": False, "error": f"{reason} after {timeout:.0f}s", "timed_out": True}
+
+
+def iter_stages(stages, on_start=None):
+    """
+    Run a stage graph on the shared pool, yielding (name, result, elapsed)
+    as soon as each stage finishes, fails or times out.
+
+    Failed and timed-out stages still count as finished so that their
+    dependents run with whatever inputs are available. on_start, if given,
+    is called with the stage name when the stage is handed to the pool.
+    All stages of one run share a RequestMemo, so work such as captioning
+    the same image is done once even when several stages ask for it.
+
+    A stage's timeout counts from when a worker starts it, so time spent
+    queued behind other requests is not charged to it. A running stage
+    can't be interrupted: after its timeout it is reported and left to
+    finish in the background, still holding its worker. Such stages keep
+    counting against the run's PIPELINE_RUN_MAX_STAGES until they end, so
+    one run never holds more than that many workers; a stage that waits
+    longer than its own timeout for one of them to free up times out too.
+    """
+    executor = get_executor()
+    memo = current_request_memo() or RequestMemo()
+    ctx = {}
+    finished = set()
+    waiting = dict(stages)
+    ready_since = {}
+    running = {}
+    orphans = set()
+
+    while waiting or running:
+        orphans = {future for future in orphans if not future.done()}
+        now = time.monotonic()
+        completed = []
+
+        for name in list(waiting):
+            deps = [d for d in waiting[name]["deps"] if d in stages]
+            if not all(d in finished for d in deps):
+                continue
+            ready_since.setdefault(name, now)
+            if len(running) + len(orphans) >= PIPELINE_RUN_MAX_STAGES:
+                if now - ready_since[name] >= waiting[name]["timeout"]:
+                    stage = waiting.pop(name)
+                    print(f"⏱️ Stage '{name}' timed out waiting for a worker")
+                    result = _timeout_result(stage["timeout"], "Stage timed out waiting for a worker")
+                    completed.append((name, result, now - ready_since[name]))
+                continue
+
+            stage = waiting.pop(name)
+            if on_start:
+                on_start(name)
+            state = {"submitted": now, "started": None}
+            # each stage gets its own context copy: one Context can't be entered by two threads
+            context = bind_request_memo(memo)
+            future = executor.submit(_run_stage, state, context, stage["func"], dict(ctx))
+            running[future] = (name, state)
+
+        if not running and not completed and not (waiting and orphans):
+            break
+
+        if not completed:
+            deadlines = [
+                state["started"] + stages[name]["timeout"]
+                for name, state in running.values() if state["started"] is not None
+            ]
+            if any(state["started"] is None for _, state in running.values()) or (waiting and orphans):
+                deadlines.append(now + STAGE_POLL_SECONDS)
+            for name in waiting:
+                if name in ready_since:
+                    deadlines.append(ready_since[name] + waiting[name]["timeout"])
+            wait(
+                list(running) + (list(orphans) if waiting else []),
+                timeout=max(0.0, min(deadlines) - time.monotonic()) if deadlines else None,
+                return_when=FIRST_COMPLETED
+            )
+
+        now = time.monotonic()
+
+        for future in [f for f in running if f.done()]:
+            name, state = running.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ Stage '{name}' failed: {e}")
+                result = {"success": False, "error": str(e)}
+            completed.append((name, result, now - (state["started"] or state["submitted"])))
+
+        for future, (name, state) in list(running.items()):
+            started = state["started"]
+            if started is not None and now >= started + stages[name]["timeout"]:
+                running.pop(future)
+                if not future.cancel():
+                    orphans.add(future)
+                print(f"⏱️ Stage '{name}' timed out after {stages[name]['timeout']:.0f}s")
+                completed.append((name, _timeout_result(stages[name]["timeout"]), now - started))
+
+        for name, result, elapsed in completed:
+            ctx[name] = result
+            finished.add(name)
+            yield name, result, elapsed
+
+
+def run_stages(stages):
+    results = {}
+    timings = {}
+    for name, result, elapsed in iter_stages(stages):
+        results[name] = result
+        timings[name] = round(elapsed, 3)
+    ordered = {name: results[name] for name in stages if name in results}
+    return ordered, timings
+
+
+def run_process_pipeline(text_content="", image_file=None, audio_file=None, pdf_file=None):
+    """Run every /process stage, overlapping the ones that don't depend on each other"""
+    uploads = [as_upload(f) if _has_file(f) else None for f in (image_file, audio_file, pdf_file)]
+    try:
+        stages = build_process_stages(text_content, *uploads)
+        return run_stages(stages)
+    finally:
+        for upload, original in zip(uploads, (image_file, audio_file, pdf_file)):
+            if upload is not None and upload is not original:
+                upload.cleanup()
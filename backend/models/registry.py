@@ -0,0 +1,308 @@
+import os
+import gc
+import time
+import threading
+from collections import OrderedDict, deque
+
+# 0 disables the budget: models stay resident once loaded
+MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "0"))
+
+# registry names (the part before ":" for per-language models such as
+# "marian:Helsinki-NLP/opus-mt-en-es") whose Linear layers are quantized to
+# int8 on load, comma-separated, or "all" for every name below
+QUANTIZABLE_MODELS = ("florence-2", "bias", "toxicity", "sentiment", "similarity", "marian")
+QUANTIZE_MODELS = [n.strip() for n in os.getenv("QUANTIZE_MODELS", "").split(",") if n.strip()]
+
+# torch intra-op thread count for the whole process, applied before the
+# first model loads; torch has no per-model or per-thread setting, so
+# every model (TrOCR, Florence-2, the classifiers) shares it. 0 keeps
+# torch's default
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))
+
+_torch_configured = False
+
+
+def _configure_torch():
+    global _torch_configured
+    if _torch_configured:
+        return
+    _torch_configured = True
+    if TORCH_NUM_THREADS:
+        import torch
+        torch.set_num_threads(TORCH_NUM_THREADS)
+
+
+def _current_rss():
+    """Resident set size of this process in bytes (Linux only, 0 elsewhere)"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return 0
+
+
+def _module_bytes(module):
+    size = 0
+    for tensor in list(module.parameters()) + list(module.buffers()):
+        size += tensor.numel() * tensor.element_size()
+    # dynamically quantized Linear layers keep their int8 weights outside parameters()
+    for submodule in module.modules():
+        packed = getattr(submodule, "_packed_params", None)
+        if packed is not None and hasattr(packed, "_weight_bias"):
+            for tensor in packed._weight_bias():
+                if tensor is not None:
+                    size += tensor.numel() * tensor.element_size()
+    return size
+
+
+def quantize_dynamic_int8(obj):
+    """
+    Quantize the Linear layers of a model, pipeline or (tokenizer, model) tuple to int8, in place.
+
+    Weights are stored as int8 and activations are quantized on the fly,
+    which is what PyTorch supports on CPU; models already moved to a GPU
+    are returned unchanged.
+    """
+    import torch
+
+    if isinstance(obj, (tuple, list)):
+        return type(obj)(quantize_dynamic_int8(item) for item in obj)
+    if isinstance(obj, torch.nn.Module):
+        if any(p.device.type != "cpu" for p in obj.parameters()):
+            print("⚠️ Skipping int8 quantization: model is not on the CPU")
+            return obj
+        return torch.ao.quantization.quantize_dynamic(obj, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    if isinstance(getattr(obj, "model", None), torch.nn.Module):
+        obj.model = quantize_dynamic_int8(obj.model)
+    return obj
+
+
+def estimate_model_bytes(obj):
+    """Size of the weights held by a model, pipeline or (processor, model) tuple"""
+    if obj is None:
+        return 0
+    if isinstance(obj, (tuple, list)):
+        return sum(estimate_model_bytes(item) for item in obj)
+    if hasattr(obj, "parameters") and hasattr(obj, "buffers"):
+        return _module_bytes(obj)
+    if hasattr(obj, "model") and hasattr(obj.model, "parameters"):
+        return _module_bytes(obj.model)
+    return 0
+
+
+class ModelRegistry:
+    """
+    Process-wide owner of every loaded model.
+
+    Models are loaded on first use through their loader, with one lock per
+    model so concurrent requests never load the same weights twice. Each
+    entry records its resident size (parameter bytes, or the RSS growth
+    during loading for models without torch weights such as spaCy). When
+    the total exceeds the budget, the least recently used models are
+    dropped; a thread still holding a reference keeps using its copy and
+    the memory is released once it is done.
+    """
+
+    def __init__(self, budget_mb=MODEL_MEMORY_BUDGET_MB, quantize_models=QUANTIZE_MODELS):
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.quantize_models = set(quantize_models)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._events = deque(maxlen=200)
+        self._counters = {"loads": 0, "evictions": 0, "load_failures": 0}
+
+    def should_quantize(self, name):
+        base = name.split(":", 1)[0]
+        if base not in QUANTIZABLE_MODELS:
+            return False
+        return base in self.quantize_models or "all" in self.quantize_models
+
+    def precision_tag(self, name):
+        """Suffix for cache keys: results of a quantized model are not interchangeable with float32 ones"""
+        return "+int8" if self.should_quantize(name) else ""
+
+    def _record(self, event, name, **details):
+        self._events.append({"event": event, "model": name, "time": time.time(), **details})
+
+    def get(self, name, loader):
+        """Return the loaded model, loading it with loader() on a miss"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+                entry["last_used"] = time.time()
+                entry["uses"] += 1
+                return entry["model"]
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None:
+                    self._entries.move_to_end(name)
+                    entry["uses"] += 1
+                    return entry["model"]
+
+            _configure_torch()
+            rss_before = _current_rss()
+            started = time.time()
+            try:
+                model = loader()
+            except Exception as e:
+                with self._lock:
+                    self._counters["load_failures"] += 1
+                    self._record("load_failed", name, error=str(e))
+                raise
+
+            if model is None:
+                with self._lock:
+                    self._counters["load_failures"] += 1
+                    self._record("load_failed", name, error="loader returned None")
+                return None
+
+            quantized = False
+            if self.should_quantize(name):
+                try:
+                    model = quantize_dynamic_int8(model)
+                    quantized = True
+                except Exception as e:
+                    print(f"⚠️ int8 quantization of {name} failed, keeping float32: {e}")
+                    with self._lock:
+                        self._record("quantize_failed", name, error=str(e))
+
+            load_seconds = time.time() - started
+            size = estimate_model_bytes(model) or max(0, _current_rss() - rss_before)
+
+            with self._lock:
+                self._entries[name] = {
+                    "model": model,
+                    "size_bytes": size,
+                    "load_seconds": load_seconds,
+                    "loaded_at": time.time(),
+                    "last_used": time.time(),
+                    "uses": 1,
+                    "quantized": quantized,
+                }
+                self._counters["loads"] += 1
+                self._record("load", name, size_mb=round(size / 1024 / 1024, 1), load_seconds=round(load_seconds, 2),
+                             quantized=quantized)
+                evicted = self._enforce_budget(keep=name)
+
+            print(f"📦 Registered {name} ({size / 1024 / 1024:.0f} MB{', int8' if quantized else ''}, loaded in {load_seconds:.1f}s)")
+            if evicted:
+                self._release_memory()
+            return model
+
+    def _enforce_budget(self, keep=None):
+        """Pop least recently used entries until under budget. Caller holds the lock."""
+        if not self.budget_bytes:
+            return []
+
+        evicted = []
+        total = sum(entry["size_bytes"] for entry in self._entries.values())
+        for name in list(self._entries):
+            if total <= self.budget_bytes:
+                break
+            if name == keep:
+                continue
+            entry = self._entries.pop(name)
+            total -= entry["size_bytes"]
+            evicted.append(name)
+            self._counters["evictions"] += 1
+            self._record("evict", name, size_mb=round(entry["size_bytes"] / 1024 / 1024, 1), reason="budget")
+            print(f"♻️ Evicted {name} to stay within the {self.budget_bytes / 1024 / 1024:.0f} MB model budget")
+        return evicted
+
+    def evict(self, name):
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            if entry is None:
+                return False
+            self._counters["evictions"] += 1
+            self._record("evict", name, size_mb=round(entry["size_bytes"] / 1024 / 1024, 1), reason="manual")
+        self._release_memory()
+        return True
+
+    def _release_memory(self):
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def is_loaded(self, name):
+        with self._lock:
+            return name in self._entries
+
+    def stats(self):
+        with self._lock:
+            total = sum(entry["size_bytes"] for entry in self._entries.values())
+            return {
+                "budget_mb": round(self.budget_bytes / 1024 / 1024, 1) if self.budget_bytes else None,
+                "quantize_models": sorted(self.quantize_models),
+                "resident_mb": round(total / 1024 / 1024, 1),
+                "process_rss_mb": round(_current_rss() / 1024 / 1024, 1),
+                **self._counters,
+                "models": [
+                    {
+                        "name": name,
+                        "size_mb": round(entry["size_bytes"] / 1024 / 1024, 1),
+                        "load_seconds": round(entry["load_seconds"], 2),
+                        "uses": entry["uses"],
+                        "quantized": entry["quantized"],
+                        "idle_seconds": round(time.time() - entry["last_used"], 1),
+                    }
+                    for name, entry in reversed(self._entries.items())
+                ],
+                "events": list(self._events)[-50:],
+            }
+
+
+registry = ModelRegistry()
+
+# names accepted by WARMUP_MODELS, mapped to "<module>.<loader>" in this package
+WARMUP_LOADERS = {
+    "trocr": "text_extraction.load_trocr_model",
+    "florence": "image_captioning.load_florence_model",
+    "similarity": "similarity.load_similarity_model",
+    "bias": "bias_detection.load_bias_model",
+    "toxicity": "bias_detection.load_toxicity_model",
+    "sentiment": "bias_detection.load_sentiment_model",
+    "spacy": "bias_detection.load_nlp",
+}
+
+
+def warmup_models(names=None):
+    """
+    Load models ahead of the first request.
+
+    names is a list of WARMUP_LOADERS keys, "all", or None to read the
+    comma-separated WARMUP_MODELS environment variable.
+    """
+    import importlib
+
+    if names is None:
+        names = [n.strip() for n in os.getenv("WARMUP_MODELS", "").split(",") if n.strip()]
+    if names == ["all"] or names == "all":
+        names = list(WARMUP_LOADERS)
+
+    timings = {}
+    for name in names:
+        target = WARMUP_LOADERS.get(name)
+        if target is None:
+            print(f"⚠️ Unknown model for warm-up: {name}")
+            continue
+        module_name, loader_name = target.rsplit(".", 1)
+        started = time.time()
+        try:
+            module = importlib.import_module(f".{module_name}", __package__)
+            getattr(module, loader_name)()
+            timings[name] = round(time.time() - started, 2)
+            print(f"🔥 Warmed up {name} in {timings[name]}s")
+        except Exception as e:
+            print(f"⚠️ Warm-up of {name} failed: {e}")
+    return timings
@@ -0,0 +1,146 @@
+import re
+
+# characters that end the literal prefix of a regex alternative
+_META = set(".^$*+?{}[]()|\\")
+_QUANTIFIERS = set("*+?{")
+
+
+def _leading_group(pattern):
+    """Source of the first group when the pattern starts with \\b( ... ), else None"""
+    prefix = "\\b("
+    if not pattern.startswith(prefix):
+        return None
+    depth = 1
+    i = len(prefix)
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                if pattern[i + 1:i + 2] in _QUANTIFIERS:
+                    return None
+                return pattern[len(prefix):i]
+        i += 1
+    return None
+
+
+def _split_alternatives(group):
+    alternatives, depth, start, i = [], 0, 0, 0
+    while i < len(group):
+        char = group[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            alternatives.append(group[start:i])
+            start = i + 1
+        i += 1
+    alternatives.append(group[start:])
+    return alternatives
+
+
+def _literal_prefix(alternative):
+    """The text every match of this alternative starts with ("senior citizens?" -> "senior citizen")"""
+    literal = []
+    i = 0
+    while i < len(alternative):
+        char = alternative[i]
+        if char == "\\":
+            escaped = alternative[i + 1:i + 2]
+            if not escaped or escaped.isalnum():
+                break
+            char, step = escaped, 2
+        elif char in _META:
+            break
+        else:
+            step = 1
+        if alternative[i + step:i + step + 1] in _QUANTIFIERS:
+            break
+        literal.append(char)
+        i += step
+    return "".join(literal)
+
+
+def keywords_for(pattern):
+    """
+    Literal strings one of which appears in any text the pattern matches, or None when unknown.
+
+    Only patterns of the form \\b(alt1|alt2|...)... are analysed; each
+    alternative contributes the literal text it starts with.
+    """
+    group = _leading_group(pattern)
+    if group is None:
+        return None
+    keywords = [_literal_prefix(alternative) for alternative in _split_alternatives(group)]
+    if not all(keywords):
+        return None
+    return sorted(set(keywords))
+
+
+class RuleEngine:
+    """
+    Compiled form of a BIAS_PATTERNS-style table.
+
+    Every pattern and suggestion term is compiled once. scan() first
+    checks which literal keywords occur in the text, then runs only the
+    patterns that could match, so for typical text most of the table is
+    never executed. Matches come back in the same order, and with the
+    same suggestion, as running re.finditer for each category and
+    pattern in turn.
+    """
+
+    def __init__(self, table):
+        self.rules = []
+        self.suggestions = {}
+        keyword_rules = {}
+
+        for bias_type, config in table.items():
+            self.suggestions[bias_type] = [
+                (re.compile(re.escape(term), re.IGNORECASE), repl)
+                for term, repl in config.get("suggestions", {}).items()
+            ]
+            for pattern in config["patterns"]:
+                index = len(self.rules)
+                keywords = keywords_for(pattern)
+                self.rules.append((bias_type, re.compile(pattern), keywords))
+                for keyword in keywords or ():
+                    keyword_rules.setdefault(keyword, []).append(index)
+
+        self.always = [i for i, (_, _, keywords) in enumerate(self.rules) if keywords is None]
+        self.keyword_rules = keyword_rules
+
+    def candidates(self, text):
+        """Indexes of the rules that can match text, in table order"""
+        selected = set(self.always)
+        for keyword, indexes in self.keyword_rules.items():
+            if keyword in text:
+                selected.update(indexes)
+        return sorted(selected)
+
+    def matches(self, text):
+        """Whether any rule matches text, without collecting the matches"""
+        return any(self.rules[index][1].search(text) for index in self.candidates(text))
+
+    def suggest(self, bias_type, matched):
+        """(original, suggested) for the first suggestion term found in matched, else None"""
+        for term, repl in self.suggestions[bias_type]:
+            if term.search(matched):
+                return matched, term.sub(repl, matched)
+        return None
+
+    def scan(self, text):
+        """Yield (bias_type, matched_text, suggestion) for every rule match"""
+        for index in self.candidates(text):
+            bias_type, pattern, _ = self.rules[index]
+            for match in pattern.finditer(text):
+                matched = match.group(0)
+                yield bias_type, matched, self.suggest(bias_type, matched)
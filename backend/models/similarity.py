@@ -1,27 +1,31 @@
+from .cache import cached_stage
+from .registry import registry
 
-_similarity_model = None
+SIMILARITY_MODEL_NAME = "all-MiniLM-L6-v2"
 
 
-def load_similarity_model():
-    global _similarity_model
-    
-    if _similarity_model is None:
-        try:
-            from sentence_transformers import SentenceTransformer
-            
-            model_name = "all-MiniLM-L6-v2"
-            print(f"Loading similarity model: {model_name}...")
-            
-            _similarity_model = SentenceTransformer(model_name)
-            print("Similarity model loaded successfully!")
-            
-        except Exception as e:
-            print(f"Error loading similarity model: {e}")
-            return None
+def _load_similarity():
+    from sentence_transformers import SentenceTransformer
     
-    return _similarity_model
+    print(f"Loading similarity model: {SIMILARITY_MODEL_NAME}...")
+    model = SentenceTransformer(SIMILARITY_MODEL_NAME)
+    print("Similarity model loaded successfully!")
+    return model
+
+
+def load_similarity_model():
+    try:
+        return registry.get("similarity", _load_similarity)
+    except Exception as e:
+        print(f"Error loading similarity model: {e}")
+        return None
 
 
+@cached_stage(
+    "similarity",
+    model_id=lambda: SIMILARITY_MODEL_NAME + registry.precision_tag("similarity"),
+    cacheable=lambda result: result.get("model") != "jaccard-fallback"
+)
 def compute_similarity(text1, text2):
     if not text1 or not text2:
         return {
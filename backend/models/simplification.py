@@ -2,11 +2,19 @@ import os
 import requests
 from dotenv import load_dotenv
 
+from .cache import cached_stage
+
 load_dotenv()
 
 HF_API_TOKEN = os.getenv("HUGGINGFACE_API_TOKEN", "")
 
 
+@cached_stage(
+    "simplification",
+    model_id=lambda: "facebook/bart-large-cnn" if HF_API_TOKEN else "rule-based",
+    # with a token, rule-based output means the API failed; don't keep it under the BART key
+    cacheable=lambda result: not HF_API_TOKEN or result.get("model", "").startswith("huggingface-api")
+)
 def simplify_text(text, max_length=150, min_length=30):
     if not text or len(text.strip()) == 0:
         return {
@@ -1,7 +1,9 @@
 import os
-import tempfile
 from dotenv import load_dotenv
 
+from .cache import cached_stage
+from .uploads import as_upload
+
 load_dotenv()
 
 def transcribe_with_assemblyai(audio_path, num_speakers=None):
@@ -102,27 +104,19 @@ def group_segments_by_speaker(segments):
     return turns
 
 
+@cached_stage("transcript", model_id="assemblyai", file_input=True)
 def transcribe_audio(audio_file, language="en"):
     """transcribe using speaker diarization"""
-    temp_path = None
+    upload = as_upload(audio_file)
+    owns_upload = upload is not audio_file
     
     try:
-        if hasattr(audio_file, 'save'):
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-            audio_file.save(temp_file.name)
-            temp_path = temp_file.name
-            temp_file.close()
-        elif hasattr(audio_file, 'read'):
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-            temp_file.write(audio_file.read())
-            temp_file.close()
-            temp_path = temp_file.name
-        else:
-            temp_path = audio_file
+        # the AssemblyAI SDK uploads from a filename
+        audio_path = upload.path()
         
-        print(f"🎤 Processing Audio: {os.path.basename(temp_path)}")
+        print(f"🎤 Processing Audio: {os.path.basename(audio_path)}")
         
-        result = transcribe_with_assemblyai(temp_path)
+        result = transcribe_with_assemblyai(audio_path)
         
         if not result:
             return {
@@ -173,8 +167,5 @@ def transcribe_audio(audio_file, language="en"):
             "language": language
         }
     finally:
-        if temp_path and hasattr(audio_file, 'save') and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
+        if owns_upload:
+            upload.cleanup()
@@ -1,37 +1,77 @@
 import os
-import tempfile
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
+from .cache import cached_stage
+from .registry import registry
+from .uploads import as_upload
+from .image_prep import MODEL_INPUT_SIDES, prepare_image
 
-def extract_text_from_pdf(pdf_file):
+TROCR_MODEL_NAME = "microsoft/trocr-base-printed"
+
+# "lines" segments the page into text lines and recognizes them in batches,
+# "page" feeds the whole image to TrOCR as a single line
+TROCR_MODE = os.getenv("TROCR_MODE", "lines")
+TROCR_BATCH_SIZE = int(os.getenv("TROCR_BATCH_SIZE", "8"))
+
+PDF_PARALLEL_WORKERS = int(os.getenv("PDF_PARALLEL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_CHUNK_SIZE = int(os.getenv("PDF_CHUNK_SIZE", "16"))
+# smaller documents are parsed serially: pool start-up would cost more than it saves
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "24"))
+
+# pages whose text layer is shorter than this and that contain images are OCR'd
+PDF_OCR_ENABLED = os.getenv("PDF_OCR_ENABLED", "1") == "1"
+PDF_OCR_DPI = int(os.getenv("PDF_OCR_DPI", "200"))
+PDF_MIN_TEXT_CHARS = int(os.getenv("PDF_MIN_TEXT_CHARS", "20"))
+
+_pdf_pool = None
+
+
+@cached_stage(
+    "pdf_extraction",
+    model_id=lambda: f"pdfplumber+trocr:{TROCR_MODE}@{PDF_OCR_DPI}dpi" if PDF_OCR_ENABLED else "pdfplumber",
+    file_input=True,
+    cacheable=lambda result: result.get("method") != "PyPDF2" and not result.get("ocr_failed_pages")
+)
+def extract_text_from_pdf(pdf_file, parallel=None):
+    """
+    Extract every page as "--- Page N ---" blocks.
+
+    Pages with a usable text layer are read by pdfplumber; image-only
+    (scanned) pages are rasterized at PDF_OCR_DPI and OCR'd with TrOCR.
+    Documents with at least PDF_PARALLEL_MIN_PAGES pages are split into
+    chunks of PDF_CHUNK_SIZE pages and parsed on a process pool; pass
+    parallel=True/False to force either path.
+    """
     try:
-        import pdfplumber
-        
-        temp_path = None
-        if hasattr(pdf_file, 'save'):
-            temp_path = tempfile.mktemp(suffix='.pdf')
-            pdf_file.save(temp_path)
-            pdf_file.seek(0)
-        else:
-            temp_path = pdf_file
-        
+        info = {}
+        ocr_pages = []
+        ocr_failed_pages = []
         extracted_text = []
-        with pdfplumber.open(temp_path) as pdf:
-            for page_num, page in enumerate(pdf.pages, 1):
-                text = page.extract_text()
-                if text:
-                    extracted_text.append(f"--- Page {page_num} ---\n{text}")
-        
-        if temp_path and os.path.exists(temp_path) and hasattr(pdf_file, 'save'):
-            os.remove(temp_path)
+        for page in iter_pdf_pages(pdf_file, parallel=parallel, info=info):
+            if page["method"] == "ocr":
+                ocr_pages.append(page["page"])
+            elif page["method"] == "ocr_failed":
+                ocr_failed_pages.append(page["page"])
+            if page["text"]:
+                extracted_text.append(f"--- Page {page['page']} ---\n{page['text']}")
         
         full_text = "\n\n".join(extracted_text)
         
-        return {
+        result = {
             "success": True,
             "text": full_text,
             "page_count": len(extracted_text),
-            "method": "pdfplumber"
+            "total_pages": info.get("total_pages", 0),
+            "ocr_pages": ocr_pages,
+            "method": "pdfplumber+trocr" if ocr_pages else "pdfplumber",
+            "parallel": info.get("parallel", False)
         }
+        if ocr_failed_pages:
+            result["ocr_failed_pages"] = ocr_failed_pages
+        return result
         
     except ImportError:
         return _extract_with_pypdf2(pdf_file)
@@ -44,12 +84,143 @@ def extract_text_from_pdf(pdf_file):
         }
 
 
+def iter_pdf_pages(pdf_file, parallel=None, info=None, ocr=None):
+    """
+    Yield {"page", "text", "method", "elapsed_ms"} for each page, in page order, as soon as it is parsed.
+
+    method is "text" for pages read from the text layer and "ocr" for
+    image-only pages that were rasterized and OCR'd (when ocr, default
+    PDF_OCR_ENABLED, is on), or "ocr_failed" with empty text when TrOCR
+    could not run. Pages are released as they are yielded, so
+    memory stays flat for long documents. If info is a dict it receives
+    "total_pages" and "parallel" before the first page is yielded.
+    """
+    import pdfplumber
+    
+    if ocr is None:
+        ocr = PDF_OCR_ENABLED
+    
+    upload = as_upload(pdf_file)
+    owns_upload = upload is not pdf_file
+    ocr_pdf = None
+    try:
+        with pdfplumber.open(upload.open()) as pdf:
+            total_pages = len(pdf.pages)
+            if parallel is None:
+                parallel = PDF_PARALLEL_WORKERS > 1 and total_pages >= PDF_PARALLEL_MIN_PAGES
+            if info is not None:
+                info.update({"total_pages": total_pages, "parallel": bool(parallel)})
+            
+            if not parallel:
+                for index in range(total_pages):
+                    started = time.perf_counter()
+                    page = pdf.pages[index]
+                    text = page.extract_text()
+                    method = "text"
+                    if ocr and _needs_ocr(text, bool(page.images)):
+                        text, method = _ocr_pdf_page(page)
+                    page.close()
+                    yield {
+                        "page": index + 1,
+                        "text": text or "",
+                        "method": method,
+                        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+                    }
+        
+        if parallel:
+            # worker processes open the document by name
+            pdf_path = upload.path()
+            for page_num, text, elapsed_ms, has_images in _iter_pages_parallel(pdf_path, total_pages):
+                method = "text"
+                if ocr and _needs_ocr(text, has_images):
+                    started = time.perf_counter()
+                    if ocr_pdf is None:
+                        ocr_pdf = pdfplumber.open(upload.open())
+                    page = ocr_pdf.pages[page_num - 1]
+                    text, method = _ocr_pdf_page(page)
+                    page.close()
+                    elapsed_ms += round((time.perf_counter() - started) * 1000, 1)
+                yield {"page": page_num, "text": text or "", "method": method, "elapsed_ms": elapsed_ms}
+    finally:
+        if ocr_pdf is not None:
+            ocr_pdf.close()
+        if owns_upload:
+            upload.cleanup()
+
+
+def _needs_ocr(text, has_images):
+    """A page is image-only when its text layer is (nearly) empty but it carries images"""
+    return has_images and len((text or "").strip()) < PDF_MIN_TEXT_CHARS
+
+
+def _ocr_pdf_page(page):
+    """(text, "ocr") for the rasterized page, or ("", "ocr_failed") when TrOCR can't run"""
+    started = time.perf_counter()
+    try:
+        image = page.to_image(resolution=PDF_OCR_DPI).original.convert("RGB")
+        text = ocr_image_lines(image)
+    except Exception as e:
+        print(f"⚠️ OCR failed for page {page.page_number}: {e}")
+        return "", "ocr_failed"
+    print(f"🔎 OCR'd page {page.page_number} in {time.perf_counter() - started:.1f}s")
+    return text, "ocr"
+
+
+def _extract_page_range(pdf_path, start, end):
+    """Process-pool worker: open the PDF itself and extract pages [start, end)"""
+    import pdfplumber
+    
+    page_texts = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for index in range(start, end):
+            started = time.perf_counter()
+            page = pdf.pages[index]
+            text = page.extract_text()
+            has_images = bool(page.images)
+            page.close()
+            page_texts.append((index + 1, text, round((time.perf_counter() - started) * 1000, 1), has_images))
+    return page_texts
+
+
+def _get_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is None:
+        # forking a process that already runs request threads and holds loaded
+        # models can copy held locks into the child; start workers clean instead
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pdf_pool = ProcessPoolExecutor(max_workers=PDF_PARALLEL_WORKERS, mp_context=multiprocessing.get_context(method))
+    return _pdf_pool
+
+
+def _iter_pages_parallel(pdf_path, total_pages):
+    """Fan page ranges out to the process pool and yield them back in page order"""
+    global _pdf_pool
+    
+    chunk_size = max(1, PDF_CHUNK_SIZE)
+    ranges = [(start, min(start + chunk_size, total_pages)) for start in range(0, total_pages, chunk_size)]
+    print(f"📄 Extracting {total_pages} pages in {len(ranges)} chunks on {PDF_PARALLEL_WORKERS} processes")
+    
+    next_page = 0
+    try:
+        pool = _get_pdf_pool()
+        futures = [pool.submit(_extract_page_range, pdf_path, start, end) for start, end in ranges]
+        for future in futures:
+            for page in future.result():
+                yield page
+                next_page = page[0]
+    except BrokenProcessPool as e:
+        print(f"⚠️ PDF process pool failed ({e}), extracting the remaining pages serially")
+        _pdf_pool = None
+        for page in _extract_page_range(pdf_path, next_page, total_pages):
+            yield page
+
+
 def _extract_with_pypdf2(pdf_file):
     """fallback PDF extraction using PyPDF2"""
     try:
         from PyPDF2 import PdfReader
         
-        reader = PdfReader(pdf_file)
+        reader = PdfReader(as_upload(pdf_file).open())
         extracted_text = []
         
         for page_num, page in enumerate(reader.pages, 1):
@@ -72,30 +243,26 @@ def _extract_with_pypdf2(pdf_file):
         }
 
 
+@cached_stage(
+    "image_extraction",
+    model_id=lambda: f"trocr-base-printed:{TROCR_MODE}@{MODEL_INPUT_SIDES['ocr']}px+florence-2-base{registry.precision_tag('florence-2')}",
+    file_input=True,
+    cacheable=lambda result: "ocr_error" not in result and result.get("model") != "fallback"
+)
 def extract_text_from_image(image_file):
     try:
-        from PIL import Image
-        import tempfile
-        
-        temp_path = tempfile.mktemp(suffix='.png')
-        if hasattr(image_file, 'save'):
-            image_file.save(temp_path)
-            image_file.seek(0)
-        else:
-            temp_path = image_file
-        
-        image = Image.open(temp_path)
-        
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        upload = as_upload(image_file)
+        # decoded once, capped for OCR; generate_alt_text below reuses the same buffer
+        image = prepare_image(upload).view("ocr")
         
         extracted_text = _extract_with_trocr(image)
+        ocr_error = None
+        if extracted_text is None:
+            ocr_error = "TrOCR extraction failed"
+            extracted_text = ""
         
         from .image_captioning import generate_alt_text
-        caption_result = generate_alt_text(temp_path)
-        
-        if os.path.exists(temp_path) and hasattr(image_file, 'save'):
-            os.remove(temp_path)
+        caption_result = generate_alt_text(upload)
         
         if not extracted_text or len(extracted_text.strip()) < 5:
             main_text = f"Image Description: {caption_result.get('alt_text', '')}"
@@ -115,6 +282,8 @@ def extract_text_from_image(image_file):
         
         if note:
             result["note"] = note
+        if ocr_error:
+            result["ocr_error"] = ocr_error
         
         if caption_result.get("success"):
             result.update({
@@ -148,23 +317,153 @@ def extract_text_from_image(image_file):
         }
 
 
+def _load_trocr():
+    from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+    
+    print(f"Loading TrOCR model: {TROCR_MODEL_NAME}...")
+    processor = TrOCRProcessor.from_pretrained(TROCR_MODEL_NAME)
+    model = VisionEncoderDecoderModel.from_pretrained(TROCR_MODEL_NAME).eval()
+    print("TrOCR model loaded successfully!")
+    return processor, model
+
+
+def load_trocr_model():
+    """Shared TrOCR processor and model, loaded once per process"""
+    try:
+        return registry.get("trocr", _load_trocr)
+    except Exception as e:
+        print(f"❌ Error loading TrOCR model: {e}")
+        return None, None
+
+
+def _otsu_threshold(gray):
+    import numpy as np
+    
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = hist.sum()
+    weights = np.cumsum(hist)
+    means = np.cumsum(hist * np.arange(256))
+    background = weights[:-1]
+    foreground = total - background
+    valid = (background > 0) & (foreground > 0)
+    if not valid.any():
+        return 128
+    between = np.zeros(255)
+    mean_bg = means[:-1][valid] / background[valid]
+    mean_fg = (means[-1] - means[:-1][valid]) / foreground[valid]
+    between[valid] = background[valid] * foreground[valid] * (mean_bg - mean_fg) ** 2
+    return int(np.argmax(between))
+
+
+def _runs(mask, max_gap=0):
+    """(start, end) pairs of True runs in a 1-D mask, bridging gaps up to max_gap"""
+    import numpy as np
+    
+    padded = np.concatenate([[False], mask, [False]])
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    runs = [[int(start), int(end)] for start, end in zip(edges[::2], edges[1::2])]
+    
+    merged = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] <= max_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [tuple(run) for run in merged]
+
+
+def segment_text_lines(image, min_line_height=6, padding=4):
+    """
+    Find text lines with projection profiles.
+
+    The page is binarized with Otsu's threshold, split into columns at wide
+    vertical gutters, and each column is split into lines at blank rows.
+    Returns a list of blocks (one per column, left to right), each a list
+    of (left, top, right, bottom) line boxes from top to bottom.
+    """
+    import numpy as np
+    
+    gray = np.asarray(image.convert("L"), dtype=np.uint8)
+    if gray.mean() < 128:
+        gray = 255 - gray
+    
+    ink = gray < _otsu_threshold(gray)
+    height, width = ink.shape
+    
+    col_has_ink = ink.sum(axis=0) > max(1, height * 0.002)
+    min_gutter = max(20, int(width * 0.03))
+    columns = _runs(col_has_ink, max_gap=min_gutter - 1)
+    
+    blocks = []
+    for col_left, col_right in columns:
+        column = ink[:, col_left:col_right]
+        row_has_ink = column.sum(axis=1) > max(1, (col_right - col_left) * 0.002)
+        lines = []
+        for top, bottom in _runs(row_has_ink, max_gap=1):
+            if bottom - top < min_line_height:
+                continue
+            line_cols = np.flatnonzero(column[top:bottom].any(axis=0))
+            left = col_left + int(line_cols[0])
+            right = col_left + int(line_cols[-1]) + 1
+            lines.append((
+                max(0, left - padding),
+                max(0, top - padding),
+                min(width, right + padding),
+                min(height, bottom + padding)
+            ))
+        if lines:
+            blocks.append(lines)
+    
+    return blocks
+
+
+def _recognize_images(images, batch_size=None):
+    """Run TrOCR over single-line images in batched generate calls"""
+    import torch
+    
+    processor, model = load_trocr_model()
+    if model is None:
+        raise RuntimeError("TrOCR model is not available")
+    
+    batch_size = batch_size or TROCR_BATCH_SIZE
+    texts = []
+    for start in range(0, len(images), batch_size):
+        batch = images[start:start + batch_size]
+        pixel_values = processor(images=batch, return_tensors="pt").pixel_values
+        with torch.no_grad():
+            generated_ids = model.generate(pixel_values)
+        texts.extend(processor.batch_decode(generated_ids, skip_special_tokens=True))
+    return texts
+
+
+def ocr_image_lines(image, batch_size=None):
+    """OCR a full page: segment it into lines, recognize them in batches, rebuild reading order"""
+    blocks = segment_text_lines(image)
+    line_count = sum(len(lines) for lines in blocks)
+    
+    if line_count == 0:
+        return ""
+    if line_count == 1:
+        return _recognize_images([image], batch_size)[0]
+    
+    crops = [image.crop(box) for lines in blocks for box in lines]
+    texts = iter(_recognize_images(crops, batch_size))
+    
+    block_texts = []
+    for lines in blocks:
+        block_lines = [next(texts).strip() for _ in lines]
+        block_texts.append("\n".join(line for line in block_lines if line))
+    
+    return "\n\n".join(text for text in block_texts if text)
+
+
 def _extract_with_trocr(image):
+    """Text in the image, "" when there is none, None when TrOCR failed"""
     try:
-        from transformers import TrOCRProcessor, VisionEncoderDecoderModel
-        
-        model_name = "microsoft/trocr-base-printed"
-        
-        print(f"Loading TrOCR model: {model_name}...")
-        processor = TrOCRProcessor.from_pretrained(model_name)
-        model = VisionEncoderDecoderModel.from_pretrained(model_name)
-        
-        pixel_values = processor(image, return_tensors="pt").pixel_values
-        generated_ids = model.generate(pixel_values)
-        generated_text = processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
-        
-        return generated_text
+        if TROCR_MODE == "lines":
+            return ocr_image_lines(image)
+        return _recognize_images([image])[0]
         
     except Exception as e:
         print(f"TrOCR extraction failed: {e}")
-        return ""
-
+        return None
@@ -3,6 +3,9 @@ import base64
 import tempfile
 from io import BytesIO
 
+from .cache import cached_stage
+from .registry import registry
+
 SUPPORTED_LANGUAGES = {
     "hi": {"name": "Hindi", "native": "हिन्दी", "gtts_code": "hi"},
     "ta": {"name": "Tamil", "native": "தமிழ்", "gtts_code": "ta"},
@@ -56,6 +59,26 @@ SUPPORTED_LANGUAGES = {
 }
 
 
+def _is_complete(result):
+    """
+    Whether a translation is worth caching: Google Translate answered for
+    every requested language (each failure is listed in "errors") and
+    every translation carries the audio that was asked for. Anything
+    else may be a transient failure and is retried on the next call.
+    """
+    if result.get("model") == "Local Helsinki-NLP (fallback)" or result.get("errors"):
+        return False
+    if result.get("audio_enabled"):
+        return all(entry.get("audio") for entry in result.get("translations", {}).values())
+    return True
+
+
+@cached_stage(
+    "translation",
+    model_id=lambda: "google-translate+gtts" + registry.precision_tag("marian"),
+    ttl=24 * 3600,
+    cacheable=_is_complete
+)
 def translate_text(text, target_languages=None, include_audio=True):
     if target_languages is None:
         target_languages = ["hi", "ta", "es", "fr", "de", "zh-CN"]
@@ -195,8 +218,10 @@ def _translate_with_local_models(text, target_languages):
             
             try:
                 model_name = LOCAL_MODELS[lang_code]
-                tokenizer = MarianTokenizer.from_pretrained(model_name)
-                model = MarianMTModel.from_pretrained(model_name)
+                tokenizer, model = registry.get(
+                    f"marian:{model_name}",
+                    lambda: (MarianTokenizer.from_pretrained(model_name), MarianMTModel.from_pretrained(model_name))
+                )
                 
                 inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=512)
                 translated_tokens = model.generate(**inputs, max_length=512)
@@ -0,0 +1,216 @@
+import io
+import os
+import mmap
+import zipfile
+import hashlib
+import tempfile
+import threading
+
+UPLOAD_SPILL_DIR = os.getenv("UPLOAD_SPILL_DIR") or None
+# per-member limit when unpacking archives, so a zip bomb can't exhaust memory
+ARCHIVE_MEMBER_MAX_MB = int(os.getenv("ARCHIVE_MEMBER_MAX_MB", "50"))
+# limit on the unpacked size of all members of one archive together
+ARCHIVE_TOTAL_MAX_MB = int(os.getenv("ARCHIVE_TOTAL_MAX_MB", "256"))
+
+
+class _ViewReader(io.RawIOBase):
+    """Read-only, seekable file object over a memoryview (no copy of the underlying bytes)"""
+
+    def __init__(self, view):
+        self._view = view
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), len(self._view) - self._pos)
+        if size <= 0:
+            return 0
+        buffer[:size] = self._view[self._pos:self._pos + size]
+        self._pos += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = len(self._view) + offset
+        self._pos = max(0, self._pos)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+class Upload:
+    """
+    One uploaded file, read once and shared by every stage of a request.
+
+    The request body is captured without copying where possible: an
+    in-memory upload is kept as its bytes, one that Werkzeug spooled to a
+    temporary file is memory-mapped. Stages read it through open(), and
+    only stages whose library insists on a filename call path(), which
+    writes a single spill file that every later caller reuses.
+    """
+
+    def __init__(self, source, filename=None):
+        self.filename = filename or getattr(source, "filename", None)
+        self._data = None
+        self._mmap = None
+        self._path = None
+        self._owns_path = False
+        self._digest = None
+        self._lock = threading.RLock()
+        # values computed from the bytes (e.g. a decoded image), shared like the upload itself
+        self.derived = {}
+
+        if isinstance(source, (str, os.PathLike)):
+            self._path = os.fspath(source)
+            self.filename = self.filename or os.path.basename(self._path)
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            self._data = source
+        else:
+            self._capture_stream(getattr(source, "stream", source))
+
+    def _capture_stream(self, stream):
+        if isinstance(stream, io.BytesIO):
+            # getvalue() shares the buffer instead of copying when nothing else exports it
+            self._data = stream.getvalue()
+            return
+        if isinstance(stream, tempfile.SpooledTemporaryFile) and not stream._rolled:
+            # small uploads are still in memory; fileno() would force them onto disk
+            self._data = stream._file.getvalue()
+            return
+
+        try:
+            fileno = stream.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            fileno = None
+
+        if fileno is not None and os.fstat(fileno).st_size > 0:
+            self._mmap = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+            return
+
+        stream.seek(0)
+        self._data = stream.read()
+
+    @property
+    def suffix(self):
+        return os.path.splitext(self.filename or "")[1]
+
+    def view(self):
+        """memoryview of the whole file"""
+        if self._data is None and self._mmap is None:
+            with self._lock:
+                if self._data is None and self._mmap is None:
+                    self._map_path()
+        if self._mmap is not None:
+            return memoryview(self._mmap)
+        return memoryview(self._data)
+
+    def _map_path(self):
+        with open(self._path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                self._data = b""
+            else:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def open(self):
+        """A fresh seekable reader positioned at the start of the file"""
+        return _ViewReader(self.view())
+
+    def read(self):
+        return bytes(self.view())
+
+    def __len__(self):
+        return len(self.view())
+
+    def __bool__(self):
+        return True
+
+    def digest(self):
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.view()).hexdigest()
+        return self._digest
+
+    def path(self):
+        """A filename for libraries that need one, written at most once per upload"""
+        if self._path is not None:
+            return self._path
+        with self._lock:
+            if self._path is None:
+                fd, path = tempfile.mkstemp(suffix=self.suffix, dir=UPLOAD_SPILL_DIR)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(self.view())
+                self._path = path
+                self._owns_path = True
+        return self._path
+
+    def save(self, destination):
+        with open(destination, "wb") as f:
+            f.write(self.view())
+
+    def cleanup(self):
+        """Remove the spill file, if this upload wrote one. Returns False if it could not be removed."""
+        with self._lock:
+            if not self._owns_path:
+                return True
+            try:
+                os.remove(self._path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                return False
+            self._path = None
+            self._owns_path = False
+            return True
+
+
+def as_upload(source):
+    """Wrap a Werkzeug FileStorage, file-like object, bytes or path as an Upload (Uploads pass through)"""
+    if source is None or isinstance(source, Upload):
+        return source
+    return Upload(source)
+
+
+def _archive_member_wanted(info, extensions):
+    name = os.path.basename(info.filename)
+    if info.is_dir() or not name or name.startswith(".") or "__MACOSX" in info.filename:
+        return False
+    return not extensions or os.path.splitext(name)[1].lower() in extensions
+
+
+def uploads_from_zip(source, extensions=None, max_files=None):
+    """
+    One Upload per file in a zip archive, in archive order.
+
+    Directories, hidden files (macOS resource forks) and, when extensions
+    is given, files with other extensions are skipped. The member list is
+    checked before anything is decompressed: raises ValueError when more
+    than max_files members remain, a member is larger than
+    ARCHIVE_MEMBER_MAX_MB or all of them together exceed
+    ARCHIVE_TOTAL_MAX_MB (zipfile never unpacks more than a member's
+    declared size).
+    """
+    upload = as_upload(source)
+    archive_name = upload.filename or "archive"
+    try:
+        archive = zipfile.ZipFile(upload.open())
+    except zipfile.BadZipFile:
+        raise ValueError(f"{archive_name} is not a valid zip file")
+    with archive:
+        members = [info for info in archive.infolist() if _archive_member_wanted(info, extensions)]
+        if max_files is not None and len(members) > max_files:
+            raise ValueError(f"{archive_name} holds too many files ({len(members)}), the limit is {max_files}")
+        for info in members:
+            if info.file_size > ARCHIVE_MEMBER_MAX_MB * 1024 * 1024:
+                raise ValueError(f"{info.filename} is larger than {ARCHIVE_MEMBER_MAX_MB} MB")
+        if sum(info.file_size for info in members) > ARCHIVE_TOTAL_MAX_MB * 1024 * 1024:
+            raise ValueError(f"{archive_name} unpacks to more than {ARCHIVE_TOTAL_MAX_MB} MB")
+        return [Upload(archive.read(info), filename=info.filename) for info in members]
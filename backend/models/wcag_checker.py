@@ -1,7 +1,10 @@
 import re
 from collections import defaultdict
 
+from .cache import cached_stage
 
+
+@cached_stage("wcag", model_id="wcag-2.1-rules")
 def check_wcag_compliance(text, html_content=None):
     if not text or not text.strip():
         return {
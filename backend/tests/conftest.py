@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# isolate the result cache and job store before any backend module reads its settings
+_scratch = tempfile.mkdtemp(prefix="udl-tests-")
+os.environ.setdefault("CACHE_DIR", os.path.join(_scratch, "cache"))
+os.environ.setdefault("JOBS_DB_PATH", os.path.join(_scratch, "jobs.db"))
+os.environ.setdefault("JOB_UPLOAD_DIR", os.path.join(_scratch, "jobs"))
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
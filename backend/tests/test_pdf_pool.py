@@ -0,0 +1,47 @@
+import os
+import time
+import uuid
+
+from models import jobs, text_extraction
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app.py")
+
+
+def _import_app_in_worker():
+    """Re-import app.py the way forkserver/spawn workers import the main module, then try to start services"""
+    import runpy
+    import multiprocessing
+
+    namespace = runpy.run_path(APP_PATH, run_name="__mp_main__")
+    started_on_import = jobs._executor is not None
+    namespace["start_background_services"]()
+    return {
+        "in_pool": multiprocessing.parent_process() is not None,
+        "started_on_import": started_on_import,
+        "started_by_hook": jobs._executor is not None,
+    }
+
+
+def test_pool_workers_do_not_start_the_job_runner():
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    conn = jobs._connect()
+    try:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, status, params, stages, created_at, updated_at) "
+            "VALUES (?, 'process', 'queued', '{}', '{}', ?, ?)",
+            (job_id, now, now)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    pool = text_extraction._get_pdf_pool()
+    try:
+        state = pool.submit(_import_app_in_worker).result(timeout=300)
+    finally:
+        pool.shutdown()
+        text_extraction._pdf_pool = None
+
+    assert state == {"in_pool": True, "started_on_import": False, "started_by_hook": False}
+    assert jobs.get_job(job_id)["status"] == "queued"
@@ -0,0 +1,47 @@
+import uuid
+
+import pytest
+
+from models import translation
+
+
+def _result(text, include_audio, audio=True, errors=None):
+    entry = {"text": "hola", "native_name": "Español", "language_code": "es"}
+    if audio:
+        entry["audio"] = "SUQz"
+    return {
+        "success": True,
+        "original": text,
+        "translations": {"Spanish": entry},
+        "errors": errors,
+        "model": "FREE Google Translate (deep-translator)",
+        "audio_enabled": include_audio
+    }
+
+
+@pytest.mark.parametrize("failure", [
+    {"audio": False},
+    {"errors": ["German: connection reset"]},
+])
+def test_transient_failure_is_not_cached(monkeypatch, failure):
+    calls = []
+
+    def fake_translate(text, target_languages, include_audio=True):
+        calls.append(text)
+        if len(calls) == 1:
+            return _result(text, include_audio, **failure)
+        return _result(text, include_audio)
+
+    monkeypatch.setattr(translation, "_translate_with_deep_translator", fake_translate)
+    text = f"Hello {uuid.uuid4().hex}"
+
+    first = translation.translate_text(text, ["es", "de"])
+    assert first["errors"] or "audio" not in first["translations"]["Spanish"]
+
+    second = translation.translate_text(text, ["es", "de"])
+    assert len(calls) == 2
+    assert second["translations"]["Spanish"]["audio"]
+    assert not second["errors"]
+
+    translation.translate_text(text, ["es", "de"])
+    assert len(calls) == 2
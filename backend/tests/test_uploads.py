@@ -0,0 +1,46 @@
+import io
+import zipfile
+
+import pytest
+
+from models import uploads
+from models.uploads import Upload, uploads_from_zip
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return Upload(buffer.getvalue(), filename="images.zip")
+
+
+def test_zip_with_too_many_members_is_rejected_before_unpacking(monkeypatch):
+    archive = _zip({f"image{i}.png": b"\x89PNG" for i in range(5)})
+
+    def fail_read(self, name, pwd=None):
+        raise AssertionError("member decompressed before the archive was checked")
+
+    monkeypatch.setattr(zipfile.ZipFile, "read", fail_read)
+    with pytest.raises(ValueError, match="too many files"):
+        uploads_from_zip(archive, {".png"}, max_files=3)
+
+
+def test_zip_over_total_size_is_rejected(monkeypatch):
+    monkeypatch.setattr(uploads, "ARCHIVE_TOTAL_MAX_MB", 1)
+    archive = _zip({f"image{i}.png": b"\0" * (400 * 1024) for i in range(3)})
+
+    with pytest.raises(ValueError, match="more than 1 MB"):
+        uploads_from_zip(archive, {".png"})
+
+
+def test_zip_members_are_filtered_and_read_in_order():
+    archive = _zip({
+        "b.png": b"first",
+        "notes.txt": b"skipped",
+        "__MACOSX/._b.png": b"skipped",
+        "photos/a.jpg": b"second",
+    })
+
+    members = uploads_from_zip(archive, {".png", ".jpg"}, max_files=2)
+    assert [(member.filename, member.read()) for member in members] == [("b.png", b"first"), ("photos/a.jpg", b"second")]
@@ -0,0 +1,78 @@
+"""
+Per-document cost of the gender-role DependencyMatcher: built per call vs cached per vocab.
+
+Texts from data/bias_eval_dataset.csv are parsed with spaCy once up
+front, so only matcher construction, matching and the emotion regex
+are timed. "per_call" rebuilds the matcher for every document the way
+detect_gender_role_bias used to; "cached" uses load_dependency_matcher.
+
+Usage: python evaluation/bench_dependency_matcher.py [--limit N] [--repeat N]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+
+os.environ["CACHE_ENABLED"] = "0"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import pandas as pd
+from spacy.matcher import DependencyMatcher
+
+from models.bias_detection import (
+    EMOTION_STEREOTYPE_PATTERN, get_dependency_patterns, load_dependency_matcher, load_nlp
+)
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BIAS_DATASET = os.path.join(ROOT, "data", "bias_eval_dataset.csv")
+EMOTION_PATTERN = r'(emotional|feelings|hormonal).*(interfere|affect|weaken|lower).*(decision|strategic|logical|rational)'
+
+
+def per_call(doc):
+    matcher = DependencyMatcher(doc.vocab)
+    for label, rule in get_dependency_patterns().items():
+        matcher.add(label, rule["patterns"])
+    matches = matcher(doc)
+    re.search(EMOTION_PATTERN, doc.text.lower())
+    return len(matches)
+
+
+def cached(doc):
+    matches = load_dependency_matcher(doc.vocab)(doc)
+    EMOTION_STEREOTYPE_PATTERN.search(doc.text.lower())
+    return len(matches)
+
+
+def time_per_doc(func, docs, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for doc in docs:
+            started = time.perf_counter()
+            func(doc)
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    nlp = load_nlp()
+    if nlp is None:
+        sys.exit("spaCy model not available")
+
+    texts = pd.read_csv(BIAS_DATASET)["text"].head(args.limit).tolist()
+    docs = list(nlp.pipe(texts))
+
+    assert [per_call(doc) for doc in docs] == [cached(doc) for doc in docs], "matchers disagree"
+
+    for name, func in (("per_call", per_call), ("cached", cached)):
+        latencies = time_per_doc(func, docs, args.repeat)
+        print(
+            f"{name:9s} docs={len(docs)} mean={statistics.mean(latencies) * 1e6:.1f}us "
+            f"median={statistics.median(latencies) * 1e6:.1f}us total={sum(latencies) * 1000:.1f}ms"
+        )
@@ -0,0 +1,97 @@
+"""
+Florence-2 decoding profiles: latency and caption quality per profile.
+
+Quality is the token F1 of each caption against a reference. References
+come from --references (JSON mapping image filename to caption) when
+given, otherwise the "quality" profile's own captions are used, so the
+score shows how far each profile drifts from the beam-search output.
+
+Usage: python evaluation/bench_florence.py <image or directory> [--runs N] [--references refs.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from PIL import Image
+from models.image_captioning import FLORENCE_PROFILES, load_florence_model, generate_florence_captions
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff"}
+TASKS = ("<CAPTION>", "<DETAILED_CAPTION>")
+
+
+def collect_images(path):
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+        )
+    return [path]
+
+
+def token_f1(prediction, reference):
+    pred_tokens = (prediction or "").lower().split()
+    ref_tokens = (reference or "").lower().split()
+    if not pred_tokens or not ref_tokens:
+        return 0.0
+    overlap = sum((Counter(pred_tokens) & Counter(ref_tokens)).values())
+    if overlap == 0:
+        return 0.0
+    precision = overlap / len(pred_tokens)
+    recall = overlap / len(ref_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def run_profile(profile, images, runs):
+    latencies = []
+    captions = {}
+    for _ in range(runs):
+        for path, image in images:
+            started = time.perf_counter()
+            captions[path] = generate_florence_captions(image, TASKS, profile=profile)
+            latencies.append(time.perf_counter() - started)
+    return latencies, captions
+
+
+def summarize(name, latencies, scores):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    quality = " ".join(f"{task} F1 {statistics.mean(values):.3f}" for task, values in scores.items())
+    print(f"{name:<10} mean {statistics.mean(latencies):7.3f}s  p50 {statistics.median(latencies):7.3f}s  "
+          f"p95 {p95:7.3f}s  {quality}  (n={len(latencies)})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("images")
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--references")
+    args = parser.parse_args()
+
+    images = [(path, Image.open(path).convert("RGB")) for path in collect_images(args.images)]
+    print(f"Benchmarking {len(images)} image(s) x {args.runs} run(s)\n")
+
+    load_florence_model()
+
+    # run "quality" first so its captions can serve as the reference
+    profiles = sorted(FLORENCE_PROFILES, key=lambda name: name != "quality")
+    results = {profile: run_profile(profile, images, args.runs) for profile in profiles}
+
+    if args.references:
+        with open(args.references, encoding="utf-8") as f:
+            named = json.load(f)
+        references = {path: {task: named.get(os.path.basename(path), "") for task in TASKS} for path, _ in images}
+    else:
+        references = results["quality"][1]
+
+    for profile, (latencies, captions) in results.items():
+        scores = {
+            task: [token_f1(captions[path].get(task), references[path].get(task)) for path, _ in images]
+            for task in TASKS
+        }
+        summarize(profile, latencies, scores)
@@ -0,0 +1,186 @@
+"""
+float32 vs dynamic int8 (QUANTIZE_MODELS) on the data/ evaluation sets.
+
+For each model group the same inputs are run twice, once with the
+float32 weights and once after reloading the model quantized, and the
+script reports mean latency per input plus:
+
+- bias/toxicity/sentiment: accuracy and F1 of detect_bias against
+  data/bias_eval_dataset.csv
+- MiniLM: mean absolute difference of similarity scores on
+  data/text_simplification_test.csv (original vs reference)
+- MarianMT: token F1 of int8 translations against the float32 ones
+  (en -> es on the same file)
+- Florence-2 (only with --images): token F1 of int8 captions against
+  the float32 ones
+
+Usage: python evaluation/bench_quantization.py [--limit N] [--images DIR] [--only bias,similarity,marian,florence]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from collections import Counter
+
+os.environ["CACHE_ENABLED"] = "0"
+os.environ["FLORENCE_BATCHING"] = "0"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score
+
+from models.registry import registry
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BIAS_DATASET = os.path.join(ROOT, "data", "bias_eval_dataset.csv")
+SIMPLIFICATION_DATASET = os.path.join(ROOT, "data", "text_simplification_test.csv")
+MARIAN_MODEL = "Helsinki-NLP/opus-mt-en-es"
+OUT_DIR = "outputs/quantization"
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp"}
+
+
+def token_f1(prediction, reference):
+    pred_tokens = (prediction or "").lower().split()
+    ref_tokens = (reference or "").lower().split()
+    if not pred_tokens or not ref_tokens:
+        return float(pred_tokens == ref_tokens)
+    overlap = sum((Counter(pred_tokens) & Counter(ref_tokens)).values())
+    if overlap == 0:
+        return 0.0
+    precision = overlap / len(pred_tokens)
+    recall = overlap / len(ref_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def with_precision(names, quantized, func, inputs):
+    """Reload the named models in the requested precision, then time func over the inputs"""
+    for name in names:
+        registry.evict(name)
+    # registry entries may carry a variant ("marian:en-es"); quantization is configured per base name
+    registry.quantize_models = {name.split(":", 1)[0] for name in names} if quantized else set()
+    func(inputs[0])  # load and warm up outside the timed loop
+
+    outputs = []
+    latencies = []
+    for item in inputs:
+        started = time.perf_counter()
+        outputs.append(func(item))
+        latencies.append(time.perf_counter() - started)
+    return outputs, latencies
+
+
+def compare(group, names, func, inputs, score):
+    fp32, fp32_latency = with_precision(names, False, func, inputs)
+    int8, int8_latency = with_precision(names, True, func, inputs)
+    sizes = {name: next((m["size_mb"] for m in registry.stats()["models"] if m["name"] == name), None) for name in names}
+
+    row = {
+        "group": group,
+        "inputs": len(inputs),
+        "fp32_ms": round(statistics.mean(fp32_latency) * 1000, 1),
+        "int8_ms": round(statistics.mean(int8_latency) * 1000, 1),
+        "speedup": round(statistics.mean(fp32_latency) / statistics.mean(int8_latency), 2),
+        "int8_size_mb": round(sum(size for size in sizes.values() if size), 1),
+        **score(fp32, int8),
+    }
+    print(" ".join(f"{key}={value}" for key, value in row.items()))
+    return row
+
+
+def bias_group(limit):
+    from models.bias_detection import detect_bias
+
+    df = pd.read_csv(BIAS_DATASET).head(limit)
+    expected = df["expected_bias"].astype(int).tolist()
+
+    def score(fp32, int8):
+        fp32_pred = [int(out["overall_bias_detected"]) for out in fp32]
+        int8_pred = [int(out["overall_bias_detected"]) for out in int8]
+        return {
+            "fp32_accuracy": round(accuracy_score(expected, fp32_pred), 4),
+            "int8_accuracy": round(accuracy_score(expected, int8_pred), 4),
+            "fp32_f1": round(f1_score(expected, fp32_pred), 4),
+            "int8_f1": round(f1_score(expected, int8_pred), 4),
+            "agreement": round(sum(a == b for a, b in zip(fp32_pred, int8_pred)) / len(expected), 4),
+        }
+
+    return compare("bias", ["bias", "toxicity", "sentiment"], detect_bias, df["text"].tolist(), score)
+
+
+def similarity_group(limit):
+    from models.similarity import compute_similarity
+
+    df = pd.read_csv(SIMPLIFICATION_DATASET).head(limit)
+    pairs = list(zip(df["original_text"], df["reference_simple"]))
+
+    def score(fp32, int8):
+        diffs = [abs(a["score"] - b["score"]) for a, b in zip(fp32, int8)]
+        return {"mean_abs_score_diff": round(statistics.mean(diffs), 4), "max_abs_score_diff": round(max(diffs), 4)}
+
+    return compare("similarity", ["similarity"], lambda pair: compute_similarity(*pair), pairs, score)
+
+
+def marian_group(limit):
+    from transformers import MarianMTModel, MarianTokenizer
+
+    name = f"marian:{MARIAN_MODEL}"
+    df = pd.read_csv(SIMPLIFICATION_DATASET).head(limit)
+
+    def translate(text):
+        tokenizer, model = registry.get(
+            name, lambda: (MarianTokenizer.from_pretrained(MARIAN_MODEL), MarianMTModel.from_pretrained(MARIAN_MODEL))
+        )
+        inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
+        return tokenizer.decode(model.generate(**inputs, max_length=512)[0], skip_special_tokens=True)
+
+    def score(fp32, int8):
+        return {
+            "token_f1_vs_fp32": round(statistics.mean(token_f1(b, a) for a, b in zip(fp32, int8)), 4),
+            "exact_match": round(sum(a == b for a, b in zip(fp32, int8)) / len(fp32), 4),
+        }
+
+    return compare("marian", [name], translate, df["original_text"].tolist(), score)
+
+
+def florence_group(images_dir, limit):
+    from PIL import Image
+    from models.image_captioning import generate_florence_captions
+
+    paths = sorted(
+        os.path.join(images_dir, name) for name in os.listdir(images_dir)
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    )[:limit]
+    images = [Image.open(path).convert("RGB") for path in paths]
+    tasks = ("<CAPTION>", "<DETAILED_CAPTION>")
+
+    def score(fp32, int8):
+        return {
+            f"{task}_f1_vs_fp32": round(statistics.mean(token_f1(b[task], a[task]) for a, b in zip(fp32, int8)), 4)
+            for task in tasks
+        }
+
+    return compare("florence", ["florence-2"], lambda image: generate_florence_captions(image, tasks), images, score)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--images")
+    parser.add_argument("--only")
+    args = parser.parse_args()
+
+    groups = set(args.only.split(",")) if args.only else {"bias", "similarity", "marian", "florence"}
+    rows = []
+    if "bias" in groups:
+        rows.append(bias_group(args.limit))
+    if "similarity" in groups:
+        rows.append(similarity_group(args.limit))
+    if "marian" in groups:
+        rows.append(marian_group(args.limit))
+    if "florence" in groups and args.images:
+        rows.append(florence_group(args.images, args.limit))
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    pd.DataFrame(rows).to_csv(os.path.join(OUT_DIR, "quantization_comparison.csv"), index=False)
+    print(f"\nSaved {os.path.join(OUT_DIR, 'quantization_comparison.csv')}")
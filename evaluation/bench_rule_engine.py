@@ -0,0 +1,84 @@
+"""
+Rule-based bias detection on long documents: per-pattern re.finditer vs the compiled RuleEngine.
+
+Documents are built by joining N texts from data/bias_eval_dataset.csv
+(N = --sizes). "legacy" is the previous _rule_based_bias_detection loop
+(every pattern and suggestion term matched from its string);
+"engine" is the current implementation. Outputs are checked to be
+identical before timing.
+
+Usage: python evaluation/bench_rule_engine.py [--sizes 10,100,1000] [--repeat N]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+
+os.environ["CACHE_ENABLED"] = "0"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import pandas as pd
+
+from models.bias_detection import BIAS_PATTERNS, _rule_based_bias_detection, get_rule_engine
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BIAS_DATASET = os.path.join(ROOT, "data", "bias_eval_dataset.csv")
+
+
+def legacy_rule_based_bias_detection(text):
+    flags, suggestions, categories = [], [], []
+    text_lower = text.lower()
+
+    for bias_type, config in BIAS_PATTERNS.items():
+        for pattern in config["patterns"]:
+            for match in re.finditer(pattern, text_lower):
+                matched = match.group(0)
+                flag_type = f"{bias_type}_generational" if bias_type == "age" and "generation" in matched else bias_type
+                flags.append({
+                    "type": flag_type,
+                    "matched_text": matched,
+                    "severity": "high" if bias_type in ["disability", "racial", "sexual_orientation", "religion", "age"] else "medium"
+                })
+                if flag_type not in categories:
+                    categories.append(flag_type)
+
+                for term, repl in config.get("suggestions", {}).items():
+                    if re.search(re.escape(term), matched, re.IGNORECASE):
+                        suggested = re.sub(re.escape(term), repl, matched, flags=re.IGNORECASE)
+                        suggestions.append({"original": matched, "suggested": suggested, "type": bias_type})
+                        break
+
+    return {"flags": flags, "suggestions": suggestions, "categories": list(set(categories))}
+
+
+def timed(func, text, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(text)
+        latencies.append(time.perf_counter() - started)
+    return statistics.median(latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = pd.read_csv(BIAS_DATASET)["text"].astype(str).tolist()
+    for text in texts:
+        assert legacy_rule_based_bias_detection(text) == _rule_based_bias_detection(text), f"outputs differ: {text!r}"
+
+    get_rule_engine()  # compile outside the timed runs
+    for size in (int(n) for n in args.sizes.split(",")):
+        document = " ".join(texts[i % len(texts)] for i in range(size))
+        assert legacy_rule_based_bias_detection(document) == _rule_based_bias_detection(document)
+        legacy = timed(legacy_rule_based_bias_detection, document, args.repeat)
+        engine = timed(_rule_based_bias_detection, document, args.repeat)
+        print(
+            f"texts={size:5d} chars={len(document):8d} legacy={legacy * 1000:.2f}ms "
+            f"engine={engine * 1000:.2f}ms speedup={legacy / engine:.2f}x"
+        )
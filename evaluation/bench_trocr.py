@@ -0,0 +1,72 @@
+"""
+Per-image TrOCR latency: reloading the model on every call (the old
+_extract_with_trocr behaviour) vs the shared handle from load_trocr_model.
+
+Usage: python evaluation/bench_trocr.py <image or directory> [--runs N]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from PIL import Image
+from models.text_extraction import TROCR_MODEL_NAME, load_trocr_model, ocr_image_lines, _recognize_images
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff"}
+
+
+def collect_images(path):
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+        )
+    return [path]
+
+
+def reload_every_call(image):
+    from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+
+    processor = TrOCRProcessor.from_pretrained(TROCR_MODEL_NAME)
+    model = VisionEncoderDecoderModel.from_pretrained(TROCR_MODEL_NAME)
+    pixel_values = processor(image, return_tensors="pt").pixel_values
+    generated_ids = model.generate(pixel_values)
+    return processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
+
+
+def time_calls(func, images, runs):
+    latencies = []
+    for _ in range(runs):
+        for image in images:
+            started = time.perf_counter()
+            func(image)
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def summarize(name, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{name:<20} mean {statistics.mean(latencies):7.3f}s  "
+          f"p50 {statistics.median(latencies):7.3f}s  p95 {p95:7.3f}s  (n={len(latencies)})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("images")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    images = [Image.open(path).convert("RGB") for path in collect_images(args.images)]
+    print(f"Benchmarking {len(images)} image(s) x {args.runs} run(s)\n")
+
+    summarize("reload per image", time_calls(reload_every_call, images, args.runs))
+
+    started = time.perf_counter()
+    load_trocr_model()
+    print(f"{'one-time load':<20} {time.perf_counter() - started:7.3f}s")
+    summarize("shared handle", time_calls(lambda image: _recognize_images([image])[0], images, args.runs))
+    summarize("lines, batched", time_calls(ocr_image_lines, images, args.runs))
@@ -0,0 +1,100 @@
+"""
+Tiered vs full bias detection on data/bias_eval_dataset.csv.
+
+Runs detect_bias in both modes on every text and reports precision,
+recall, F1 and mean latency for each, the recall given up by tiered
+mode, the share of sentences it escalated to the transformer models,
+and the biased texts only full mode caught. Tiered mode needs the
+trained screen at BIAS_SCREEN_MODEL_PATH (see train_bias_screen.py);
+without it every sentence is escalated, so the script refuses to run.
+
+Usage: python evaluation/eval_bias_tiered.py [--limit N]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+os.environ["CACHE_ENABLED"] = "0"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+from models.bias_detection import detect_bias
+from models.bias_screen import load_screen
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BIAS_DATASET = os.path.join(ROOT, "data", "bias_eval_dataset.csv")
+OUT_DIR = "outputs/bias"
+
+
+def run(texts, mode):
+    outputs, latencies = [], []
+    for text in texts:
+        started = time.perf_counter()
+        outputs.append(detect_bias(text, mode=mode))
+        latencies.append(time.perf_counter() - started)
+    return outputs, latencies
+
+
+def metrics(expected, predicted, latencies):
+    return {
+        "accuracy": round(accuracy_score(expected, predicted), 4),
+        "precision": round(precision_score(expected, predicted, zero_division=0), 4),
+        "recall": round(recall_score(expected, predicted, zero_division=0), 4),
+        "f1": round(f1_score(expected, predicted, zero_division=0), 4),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=0)
+    args = parser.parse_args()
+
+    if load_screen() is None:
+        sys.exit("No trained bias screen found; run evaluation/train_bias_screen.py first")
+
+    df = pd.read_csv(BIAS_DATASET)
+    if args.limit:
+        df = df.head(args.limit)
+    texts = df["text"].tolist()
+    expected = df["expected_bias"].astype(int).tolist()
+
+    detect_bias(texts[0], mode="full")  # load every model before timing
+    full, full_latency = run(texts, "full")
+    tiered, tiered_latency = run(texts, "tiered")
+
+    full_pred = [int(out["overall_bias_detected"]) for out in full]
+    tiered_pred = [int(out["overall_bias_detected"]) for out in tiered]
+    sentences = sum(out["tiering"]["sentences"] for out in tiered)
+    escalated = sum(out["tiering"]["escalated"] for out in tiered)
+
+    rows = [
+        {"mode": "full", **metrics(expected, full_pred, full_latency)},
+        {"mode": "tiered", **metrics(expected, tiered_pred, tiered_latency)},
+    ]
+    summary = pd.DataFrame(rows)
+    print(summary.to_string(index=False))
+    print(f"\nScreen: {load_screen().version}")
+    print(f"Escalated sentences: {escalated} / {sentences} ({escalated / sentences:.1%})")
+    print(f"Recall cost: {rows[0]['recall'] - rows[1]['recall']:.4f}")
+
+    missed = df[[e == 1 and f == 1 and t == 0 for e, f, t in zip(expected, full_pred, tiered_pred)]]
+    print(f"Biased texts caught only in full mode: {len(missed)}")
+    for text in missed["text"]:
+        print(f"  - {text}")
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    summary.to_csv(os.path.join(OUT_DIR, "tiered_summary.csv"), index=False)
+    pd.DataFrame({
+        "id": df["id"],
+        "text": texts,
+        "expected_bias": expected,
+        "full_pred": full_pred,
+        "tiered_pred": tiered_pred,
+        "escalation_rate": [out["tiering"]["escalation_rate"] for out in tiered],
+    }).to_csv(os.path.join(OUT_DIR, "tiered_detailed_results.csv"), index=False)
+    print(f"\nSaved {os.path.join(OUT_DIR, 'tiered_summary.csv')}")
@@ -0,0 +1,91 @@
+"""
+Train the first-tier linear screen used by BIAS_MODE=tiered.
+
+Every sentence of the corpus is labelled by the full detect_bias pipeline
+(biased or not), and a logistic regression over hashed unigrams and
+bigrams is fitted to those labels, so the screen learns which sentences
+the transformer models would flag. The weights are written to
+BIAS_SCREEN_MODEL_PATH (or --out), where the backend picks them up.
+
+Train on representative course material, not on data/bias_eval_dataset.csv,
+which eval_bias_tiered.py uses to measure the screen.
+
+Usage: python evaluation/train_bias_screen.py <corpus.csv|corpus.txt>... [--column text] [--limit N] [--out PATH]
+"""
+import os
+import re
+import sys
+import argparse
+
+os.environ["CACHE_ENABLED"] = "0"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import recall_score, precision_score
+
+from models.bias_detection import detect_bias
+from models.bias_screen import BIAS_SCREEN_FEATURES, BIAS_SCREEN_MODEL_PATH, BIAS_SCREEN_THRESHOLD, hashed_features
+
+
+def read_corpus(paths, column):
+    texts = []
+    for path in paths:
+        if path.endswith(".csv"):
+            texts.extend(pd.read_csv(path)[column].dropna().astype(str).tolist())
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                texts.extend(line.strip() for line in f if line.strip())
+    return texts
+
+
+def split_sentences(texts):
+    sentences = []
+    for text in texts:
+        sentences.extend(s for s in re.split(r'(?<=[.!?])\s+', text) if s.strip())
+    return sentences
+
+
+def to_matrix(sentences):
+    rows, cols, values = [], [], []
+    for row, sentence in enumerate(sentences):
+        for bucket, count in hashed_features(sentence).items():
+            rows.append(row)
+            cols.append(bucket)
+            values.append(count)
+    return csr_matrix((values, (rows, cols)), shape=(len(sentences), BIAS_SCREEN_FEATURES), dtype=np.float32)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus", nargs="+")
+    parser.add_argument("--column", default="text")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--out", default=BIAS_SCREEN_MODEL_PATH)
+    args = parser.parse_args()
+
+    sentences = split_sentences(read_corpus(args.corpus, args.column))
+    if args.limit:
+        sentences = sentences[:args.limit]
+    print(f"Labelling {len(sentences)} sentences with the full pipeline...")
+    labels = np.array([int(detect_bias(sentence, mode="full").get("overall_bias_detected", False)) for sentence in sentences])
+    print(f"Biased sentences: {labels.sum()} / {len(labels)}")
+    if labels.min() == labels.max():
+        sys.exit("Need both biased and unbiased sentences to train the screen")
+
+    features = to_matrix(sentences)
+    model = LogisticRegression(class_weight="balanced", max_iter=2000)
+    model.fit(features, labels)
+
+    predicted = (model.predict_proba(features)[:, 1] >= BIAS_SCREEN_THRESHOLD).astype(int)
+    print(
+        f"Training recall={recall_score(labels, predicted):.4f} precision={precision_score(labels, predicted):.4f} "
+        f"escalated={predicted.mean():.3f} at threshold {BIAS_SCREEN_THRESHOLD}"
+    )
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "wb") as f:
+        np.savez(f, weights=model.coef_[0].astype(np.float32), bias=np.float64(model.intercept_[0]))
+    print(f"Saved {args.out}")